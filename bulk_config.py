@@ -0,0 +1,420 @@
+"""
+公告頻道設定與監控採集清單的匯入 / 匯出（JSON 或 CSV）。
+
+JSON:
+  {"version": 1, "guilds": {"<伺服器 id>": {
+      "channels": {"<頻道 id>": "fish" | "ore"},
+      "lead_times": {"<頻道 id>": [15, 5]},
+      "ores": {"<採集名稱>": {"time": "6,18", "place": "<地點>"}}}}}
+CSV（每列一筆，欄位依 kind 使用）:
+  kind,guild,channel,type,lead_times,ore,time,place
+  channel,<伺服器>,<頻道>,fish,"15,5",,,
+  ore,<伺服器>,,,,<採集名稱>,"6,18",<地點>
+
+匯入前先驗證整份檔案，有任何錯誤就不寫入；寫入時每個伺服器只需要幾個指令，
+以 pipeline（MULTI/EXEC）分批送出，數千筆設定也只要幾次往返。
+分批只切在伺服器之間，同一個伺服器的設定一定在同一個 transaction 中寫入。
+同一伺服器的同類型頻道只能有一個，匯入的頻道會取代原本同類型的頻道（在 Lua script 中
+讀取並合併，不會與 bot 的 save_channels 互相覆蓋）；
+replace=True 時先清掉檔案中伺服器原有的頻道與採集設定。
+
+    python bulk_config.py export [--guild <id>] [--format json|csv] [-o config.json]
+    python bulk_config.py import config.csv [--guild <id>] [--replace] [--dry-run]
+"""
+import argparse
+import asyncio
+import csv
+from dataclasses import dataclass, field
+import io
+import json
+from pathlib import Path
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ore_notice import get_ore_hours
+
+FORMAT_VERSION = 1
+FORMATS = ('json', 'csv')
+CSV_FIELDS = ['kind', 'guild', 'channel', 'type', 'lead_times', 'ore', 'time', 'place']
+CHANNEL_TYPES = ('fish', 'ore')
+PIPELINE_BATCH = 500     # 每次往返最多送出的指令數
+MAX_ERRORS = 20          # 驗證錯誤最多列出幾筆
+ORE_VERSION_KEY = 'ore:version'  # 匯入後遞增，讓執行中的 bot 重新載入監控採集
+
+# 合併頻道設定：移除與匯入頻道同類型的舊頻道後寫入；KEYS: channel:<伺服器>, channel:ids
+# ARGV: 伺服器 id, 之後為 頻道 id, 類型 兩個一組
+_MERGE_CHANNELS = """
+local types = {}
+for i = 2, #ARGV, 2 do
+    types[ARGV[i + 1]] = true
+end
+local old = redis.call('HGETALL', KEYS[1])
+for i = 1, #old, 2 do
+    if types[old[i + 1]] then
+        redis.call('HDEL', KEYS[1], old[i])
+    end
+end
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if redis.call('HLEN', KEYS[1]) > 0 then
+    redis.call('SADD', KEYS[2], ARGV[1])
+else
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+
+class ConfigError(ValueError):
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__("\n".join(errors[:MAX_ERRORS]))
+
+
+@dataclass
+class GuildConfig:
+    channels: Dict[str, str] = field(default_factory=dict)          # 頻道 id -> fish / ore
+    lead_times: Dict[str, List[int]] = field(default_factory=dict)  # 頻道 id -> 提前分鐘
+    ores: Dict[str, dict] = field(default_factory=dict)             # 採集名稱 -> {'time', 'place'}
+
+
+def _is_int(value) -> bool:
+    # JSON 的 true/false 在 Python 中是 int 的子類別
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _cmd(method: str, *args, **kwargs) -> Tuple[str, tuple, dict]:
+    return method, args, kwargs
+
+
+class _Builder:
+    """逐筆驗證並累積設定；錯誤只記錄，最後一次丟出"""
+
+    def __init__(self, default_guild: Optional[str], only_guild: Optional[str], max_lead_minutes: int):
+        self.default_guild = default_guild
+        self.only_guild = only_guild
+        self.max_lead_minutes = max_lead_minutes
+        self.config: Dict[str, GuildConfig] = {}
+        self.errors: List[str] = []
+
+    def error(self, where: str, message: str):
+        self.errors.append(f"{where}: {message}")
+
+    def guild(self, where: str, guild_id) -> Optional[GuildConfig]:
+        guild_id = str(guild_id or self.default_guild or '').strip()
+        if not guild_id.isdigit():
+            self.error(where, f"invalid guild id '{guild_id}'")
+            return None
+        if self.only_guild is not None and guild_id != self.only_guild:
+            self.error(where, f"guild {guild_id} is not this server")
+            return None
+        return self.config.setdefault(guild_id, GuildConfig())
+
+    def channel(self, where: str, guild_id, channel_id, channel_type, lead_times):
+        guild = self.guild(where, guild_id)
+        channel_id = str(channel_id or '').strip()
+        if not channel_id.isdigit():
+            self.error(where, f"invalid channel id '{channel_id}'")
+            return
+        if channel_type not in CHANNEL_TYPES:
+            self.error(where, f"channel type must be fish or ore, got '{channel_type}'")
+            return
+        leads = self.leads(where, lead_times)
+        if guild is None:
+            return
+        if channel_id in guild.channels:
+            self.error(where, f"duplicate channel {channel_id}")
+            return
+        if channel_type in guild.channels.values():
+            self.error(where, f"more than one {channel_type} channel for guild")
+            return
+        guild.channels[channel_id] = channel_type
+        if leads:
+            guild.lead_times[channel_id] = leads
+
+    def leads(self, where: str, lead_times) -> List[int]:
+        if lead_times in (None, '', []):
+            return []
+        try:
+            if isinstance(lead_times, str):
+                lead_times = [int(m) for m in lead_times.split(',')]
+            leads = sorted({int(m) for m in lead_times}, reverse=True)
+        except (TypeError, ValueError):
+            self.error(where, f"invalid lead times '{lead_times}'")
+            return []
+        if any(not 1 <= m <= self.max_lead_minutes for m in leads):
+            self.error(where, f"lead times must be 1~{self.max_lead_minutes} minutes")
+            return []
+        return leads
+
+    def ore(self, where: str, guild_id, name, time, place):
+        guild = self.guild(where, guild_id)
+        name = str(name or '').strip()
+        place = str(place or '').strip()
+        time = str(time or '').replace(' ', '')
+        if not name or not place:
+            self.error(where, "ore name and place are required")
+            return
+        try:
+            get_ore_hours(time)
+        except ValueError:
+            self.error(where, f"invalid eorzea hours '{time}'")
+            return
+        if guild is None:
+            return
+        if name in guild.ores:
+            self.error(where, f"duplicate ore '{name}'")
+            return
+        guild.ores[name] = {'time': time, 'place': place}
+
+    def result(self) -> Dict[str, GuildConfig]:
+        if self.errors:
+            raise ConfigError(self.errors)
+        return self.config
+
+
+def parse_config(data: bytes, fmt: str, default_guild: Optional[str] = None, only_guild: Optional[str] = None,
+                 max_lead_minutes: int = 60) -> Dict[str, GuildConfig]:
+    """
+    解析並驗證匯入檔；有錯誤時丟出 ConfigError（包含所有錯誤）。
+    default_guild 用於沒有填伺服器的列，only_guild 限制只能匯入該伺服器。
+    """
+    builder = _Builder(default_guild, only_guild, max_lead_minutes)
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ConfigError(["file is not UTF-8"])
+
+    if fmt == 'json':
+        try:
+            raw = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ConfigError([f"invalid JSON: {e}"])
+        if not isinstance(raw, dict) or not isinstance(raw.get('guilds'), dict):
+            raise ConfigError(["JSON must be an object with a 'guilds' object"])
+        if raw.get('version', FORMAT_VERSION) != FORMAT_VERSION:
+            raise ConfigError([f"unsupported version {raw.get('version')}"])
+        for guild_id, guild in raw['guilds'].items():
+            if not isinstance(guild, dict):
+                builder.error(f"guilds.{guild_id}", "must be an object")
+                continue
+            builder.guild(f"guilds.{guild_id}", guild_id)
+            sections = {}
+            for key in ('channels', 'lead_times', 'ores'):
+                sections[key] = guild.get(key) or {}
+                if not isinstance(sections[key], dict):
+                    builder.error(f"guilds.{guild_id}.{key}", "must be an object")
+                    sections[key] = {}
+            lead_times = sections['lead_times']
+            for channel_id, leads in lead_times.items():
+                if not (isinstance(leads, str) or isinstance(leads, list) and all(_is_int(m) for m in leads)):
+                    builder.error(f"guilds.{guild_id}.lead_times.{channel_id}", "must be a list of minutes")
+                    lead_times[channel_id] = None
+                elif channel_id not in sections['channels']:
+                    builder.error(f"guilds.{guild_id}.lead_times.{channel_id}", "channel is not in channels")
+            for channel_id, channel_type in sections['channels'].items():
+                if not isinstance(channel_type, str):
+                    builder.error(f"guilds.{guild_id}.channels.{channel_id}", "must be \"fish\" or \"ore\"")
+                    continue
+                builder.channel(f"guilds.{guild_id}.channels.{channel_id}", guild_id, channel_id, channel_type,
+                                lead_times.get(channel_id))
+            for name, ore in sections['ores'].items():
+                where = f"guilds.{guild_id}.ores.{name}"
+                if not isinstance(ore, dict):
+                    builder.error(where, "must be an object")
+                    continue
+                if not (isinstance(ore.get('time'), str) or _is_int(ore.get('time'))) \
+                        or not isinstance(ore.get('place'), str):
+                    builder.error(where, "time must be ET hours and place must be a string")
+                    continue
+                builder.ore(where, guild_id, name, ore['time'], ore['place'])
+    elif fmt == 'csv':
+        reader = csv.DictReader(io.StringIO(text))
+        missing = set(CSV_FIELDS) - set(reader.fieldnames or [])
+        if missing:
+            raise ConfigError([f"CSV header is missing {', '.join(sorted(missing))}"])
+        for row in reader:
+            where = f"line {reader.line_num}"
+            kind = (row['kind'] or '').strip()
+            if kind == 'channel':
+                builder.channel(where, row['guild'], row['channel'], (row['type'] or '').strip(), row['lead_times'])
+            elif kind == 'ore':
+                builder.ore(where, row['guild'], row['ore'], row['time'], row['place'])
+            else:
+                builder.error(where, f"kind must be channel or ore, got '{kind}'")
+    else:
+        raise ConfigError([f"unsupported format '{fmt}'"])
+    return builder.result()
+
+
+def format_config(config: Dict[str, GuildConfig], fmt: str) -> bytes:
+    if fmt == 'json':
+        guilds = {
+            guild_id: {'channels': g.channels, 'lead_times': g.lead_times, 'ores': g.ores}
+            for guild_id, g in sorted(config.items())
+        }
+        return json.dumps({'version': FORMAT_VERSION, 'guilds': guilds}, ensure_ascii=False, indent=2).encode("utf-8")
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for guild_id, g in sorted(config.items()):
+        for channel_id, channel_type in g.channels.items():
+            writer.writerow({
+                'kind': 'channel', 'guild': guild_id, 'channel': channel_id, 'type': channel_type,
+                'lead_times': ','.join(str(m) for m in g.lead_times.get(channel_id, [])),
+            })
+        for name, ore in g.ores.items():
+            writer.writerow({'kind': 'ore', 'guild': guild_id, 'ore': name, 'time': ore['time'], 'place': ore['place']})
+    # 加上 BOM，Excel 開啟時中文不會變亂碼
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+def guess_format(filename: str) -> Optional[str]:
+    suffix = Path(filename).suffix.lower().lstrip('.')
+    return suffix if suffix in FORMATS else None
+
+
+async def _run_batches(redis, commands: List[Tuple[str, tuple, dict]]) -> List[Any]:
+    results = []
+    for i in range(0, len(commands), PIPELINE_BATCH):
+        results.extend(await redis.pipeline(commands[i:i + PIPELINE_BATCH]))
+    return results
+
+
+async def _run_groups(redis, groups: List[List[Tuple[str, tuple, dict]]]) -> int:
+    """
+    每組指令（一個伺服器的設定）完整放進同一個 MULTI/EXEC，只在組與組之間切批；
+    回傳往返次數
+    """
+    batches = [[]]
+    for group in groups:
+        if batches[-1] and len(batches[-1]) + len(group) > PIPELINE_BATCH:
+            batches.append([])
+        batches[-1].extend(group)
+    for batch in batches:
+        if batch:
+            await redis.pipeline(batch)
+    return sum(1 for batch in batches if batch)
+
+
+async def export_config(redis, guild_ids: Optional[Iterable[str]] = None) -> Dict[str, GuildConfig]:
+    """讀出指定（預設全部）伺服器的頻道與採集設定"""
+    if guild_ids is None:
+        channel_guilds, ore_guilds = await redis.pipeline(
+            [_cmd('smembers', 'channel:ids'), _cmd('smembers', 'ore:guilds')], transaction=False,
+        )
+        guild_ids = channel_guilds | ore_guilds
+    guild_ids = sorted(str(g) for g in guild_ids)
+
+    commands = [_cmd('hgetall', 'channel:lead')]
+    for guild_id in guild_ids:
+        commands += [_cmd('hgetall', f'channel:{guild_id}'), _cmd('hgetall', f'ore:{guild_id}')]
+    results = await _run_batches(redis, commands)
+
+    lead_times = results[0]
+    config = {}
+    for i, guild_id in enumerate(guild_ids):
+        channels, ores = results[1 + 2 * i], results[2 + 2 * i]
+        config[guild_id] = GuildConfig(
+            channels=dict(channels),
+            lead_times={c: [int(m) for m in lead_times[c].split(',')] for c in channels if c in lead_times},
+            ores={name: json.loads(value) for name, value in ores.items()},
+        )
+    return config
+
+
+async def import_config(redis, config: Dict[str, GuildConfig], replace: bool = False) -> Dict[str, int]:
+    """把 parse_config 的結果寫入 Redis，回傳各類寫入筆數"""
+    guild_ids = sorted(config)
+    groups = []
+    for guild_id in guild_ids:
+        guild = config[guild_id]
+        commands = []
+        if replace:
+            commands.append(_cmd('delete', f'ore:{guild_id}'))
+            commands.append(_cmd('delete', f'channel:{guild_id}'))
+            if guild.channels:
+                commands.append(_cmd('hset', f'channel:{guild_id}', mapping=guild.channels))
+                commands.append(_cmd('sadd', 'channel:ids', guild_id))
+            else:
+                commands.append(_cmd('srem', 'channel:ids', guild_id))
+        elif guild.channels:
+            # 與 save_channels 相同：每種公告只保留一個頻道；讀取與寫入在同一個 script 內完成
+            args = [arg for channel in guild.channels.items() for arg in channel]
+            commands.append(_cmd('eval', _MERGE_CHANNELS, 2, f'channel:{guild_id}', 'channel:ids', guild_id, *args))
+
+        if guild.ores:
+            commands.append(_cmd('hset', f'ore:{guild_id}', mapping={
+                name: json.dumps(ore, ensure_ascii=False) for name, ore in guild.ores.items()
+            }))
+            commands.append(_cmd('sadd', 'ore:guilds', guild_id))
+        if guild.lead_times:
+            commands.append(_cmd('hset', 'channel:lead', mapping={
+                c: ','.join(str(m) for m in leads) for c, leads in guild.lead_times.items()
+            }))
+        groups.append(commands)
+    groups.append([_cmd('incr', ORE_VERSION_KEY)])
+    round_trips = await _run_groups(redis, groups)
+
+    return {
+        'guilds': len(guild_ids),
+        'channels': sum(len(g.channels) for g in config.values()),
+        'ores': sum(len(g.ores) for g in config.values()),
+        'round_trips': round_trips,
+    }
+
+
+async def _main(args):
+    from dc_bot import redis_wrapper, MAX_LEAD_MINUTES
+
+    if args.command == 'export':
+        fmt = args.format or (guess_format(args.output) if args.output else None) or 'json'
+        config = await export_config(redis_wrapper, [args.guild] if args.guild else None)
+        data = format_config(config, fmt)
+        if args.output:
+            Path(args.output).write_bytes(data)
+            print(f"exported {len(config)} guilds to {args.output}", file=sys.stderr)
+        else:
+            sys.stdout.buffer.write(data)
+        return 0
+
+    fmt = args.format or guess_format(args.path)
+    if fmt is None:
+        print("cannot tell the format from the file name; use --format", file=sys.stderr)
+        return 2
+    try:
+        config = parse_config(Path(args.path).read_bytes(), fmt, default_guild=args.guild,
+                              max_lead_minutes=MAX_LEAD_MINUTES)
+    except ConfigError as e:
+        print(f"{len(e.errors)} errors, nothing imported:\n{e}", file=sys.stderr)
+        return 1
+    if args.dry_run:
+        print(f"ok: {len(config)} guilds, {sum(len(g.channels) for g in config.values())} channels, "
+              f"{sum(len(g.ores) for g in config.values())} ores")
+        return 0
+    result = await import_config(redis_wrapper, config, replace=args.replace)
+    print(f"imported {result['channels']} channels and {result['ores']} ores for {result['guilds']} guilds "
+          f"in {result['round_trips']} round trips")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="匯入 / 匯出公告頻道與監控採集設定")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="匯出設定")
+    export.add_argument("--guild", help="只匯出這個伺服器")
+    export.add_argument("--format", choices=FORMATS)
+    export.add_argument("-o", "--output", help="輸出檔案（預設 stdout）")
+    imp = sub.add_parser("import", help="匯入設定")
+    imp.add_argument("path")
+    imp.add_argument("--guild", help="沒有填伺服器的列使用這個伺服器")
+    imp.add_argument("--format", choices=FORMATS, help="預設依副檔名判斷")
+    imp.add_argument("--replace", action="store_true", help="先清除檔案中伺服器原有的設定")
+    imp.add_argument("--dry-run", action="store_true", help="只驗證，不寫入")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,29 @@ from pathlib import Path
 from datetime import datetime, timedelta, time, timezone
 from zoneinfo import ZoneInfo
 import os
-from typing import Dict, Optional, Tuple, List, Any
-from fish_notice import get_bait, get_source
-from ore_notice import get_ore, convert_to_eorzea_time, EorzeaTime
+from typing import Callable, Dict, Optional, Set, Tuple, List, Any
+import hashlib
+import hmac
+import re
+import io
+import uuid
+from fish_notice import (
+    get_bait, get_source, get_sources, get_voyage, get_voyage_info, get_voyage_number, get_voyage_time,
+    render_bait, get_kings, TIME_CHT,
+)
+import game_data
+from ore_notice import (
+    get_ore_hours, render_ore, convert_to_eorzea_time, eorzea_hour_start,
+    EorzeaTime, OreIndex, EORZEA_HOUR_EARTH_SECONDS,
+)
+from loop_watchdog import LoopWatchdog
+from job_queue import JobQueue
+import route_card
+from leader_lease import LeaderLease
+from memory_report import memory_report
+import voyage_calendar
+import bulk_config
+from webhook_transport import WebhookRegistry
 import signal
 import logging
 from logging.handlers import TimedRotatingFileHandler
@@ -100,12 +120,27 @@ class RedisWrapper:
 
     async def execute(self, method: str, *args, retries: int = 3, **kwargs) -> Any:
         """Generic executor: does limited retries and will reconnect on connection errors."""
+        return await self._with_retry(method, lambda client: getattr(client, method)(*args, **kwargs), retries)
+
+    async def pipeline(self, commands: List[Tuple[str, tuple, dict]], transaction: bool = True, retries: int = 3) -> List[Any]:
+        """
+        Send (method, args, kwargs) commands in one round trip (MULTI/EXEC when transaction=True).
+        The whole batch is resent on connection errors, so commands should be idempotent.
+        """
+        async def run(client):
+            pipe = client.pipeline(transaction=transaction)
+            for method, args, kwargs in commands:
+                getattr(pipe, method)(*args, **kwargs)
+            return await pipe.execute()
+
+        return await self._with_retry(f"pipeline({len(commands)})", run, retries)
+
+    async def _with_retry(self, method: str, call: Callable[[aioredis.Redis], Any], retries: int) -> Any:
         backoff = 1.0
         for attempt in range(1, retries + 1):
             try:
                 await self._ensure_client()
-                func = getattr(self._client, method)
-                return await func(*args, **kwargs)
+                return await call(self._client)
             except RedisConnectionError as e:
                 self._logger.warning("Redis connection error on %s attempt %s: %s", method, attempt, e, exc_info=True)
                 # try reconnect
@@ -144,6 +179,13 @@ class RedisWrapper:
     async def delete(self, *args, **kwargs): return await self.execute("delete", *args, **kwargs)
     async def hset(self, *args, **kwargs): return await self.execute("hset", *args, **kwargs)
     async def sadd(self, *args, **kwargs): return await self.execute("sadd", *args, **kwargs)
+    async def srem(self, *args, **kwargs): return await self.execute("srem", *args, **kwargs)
+    async def hdel(self, *args, **kwargs): return await self.execute("hdel", *args, **kwargs)
+    async def hget(self, *args, **kwargs): return await self.execute("hget", *args, **kwargs)
+    async def eval(self, *args, **kwargs): return await self.execute("eval", *args, **kwargs)
+    async def get(self, *args, **kwargs): return await self.execute("get", *args, **kwargs)
+    async def set(self, *args, **kwargs): return await self.execute("set", *args, **kwargs)
+    async def incr(self, *args, **kwargs): return await self.execute("incr", *args, **kwargs)
     async def ping(self, *args, **kwargs): return await self.execute("ping", *args, **kwargs)
     # add other methods you use similarly...
 
@@ -184,31 +226,211 @@ console.setFormatter(formatter)
 logger.addHandler(console)
 
 TOKEN = os.getenv("DISCORD_BOT_TOKEN")
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN")  # /debug/* 需帶 Authorization: Bearer <DEBUG_TOKEN>；未設定時只接受本機連線
+API_SECRET = os.getenv("API_SECRET")  # 產生 /api/ores 每個伺服器的存取 token；未設定時停用 /api/ores
 PORT = int(os.environ.get("PORT", 10000))  # Render 會提供 PORT
 CHANNELS_FILE = Path("channels.json")
 TIMEZONE = ZoneInfo("Asia/Taipei")
 SCHEDULE_HOURS = list(range(1, 24, 2))
 SCHEDULE_MINUTE = 55
+SCHEDULE_LEAD_MINUTES = 5  # 公告比出航 / 採集時間提前的分鐘數
+DM_CONCURRENCY = int(os.getenv("DM_CONCURRENCY", 5))
+
+# 設為 1 時改用 Redis 延遲工作佇列排程公告（可多個 worker、重啟不遺失）
+USE_JOB_QUEUE = os.getenv("USE_JOB_QUEUE", "0") == "1"
+DEFAULT_LEAD_MINUTES = [5]
+MAX_LEAD_MINUTES = 60
+IMPORT_MAX_BYTES = 2 * 1024 * 1024  # 匯入設定檔的大小上限
+JOB_PLAN_INTERVAL = 60      # 排程器每幾秒排入一次未來的 job
+COMMAND_CLAIM_SECONDS = 10 * 60  # 指令訊息 id 的去重標記保留秒數
+JOB_CLAIM_BATCH = 10        # worker 每次領取的 job 數；處理中的 job 會定期延長逾時時間
+
+# 航班路線圖卡（需要 Pillow）
+ROUTE_CARDS = os.getenv("ROUTE_CARDS", "0") == "1"
+CARD_AHEAD_VOYAGES = 2      # 預先產生接下來幾班船的圖卡
+card_renderer = None
+if ROUTE_CARDS:
+    if route_card.is_available():
+        card_renderer = route_card.CardRenderer(
+            route_card.CardCache(os.getenv("CARD_DIR", "cards"), int(os.getenv("CARD_CACHE_MAX_BYTES", 20 * 1024 * 1024))),
+            font_path=os.getenv("CARD_FONT_PATH"),
+            workers=int(os.getenv("CARD_WORKERS", 1)),
+        )
+    else:
+        logger.warning("ROUTE_CARDS is set but Pillow is not installed; route cards disabled")
+
+# 航班日曆檔（供排程頁面與外部工具讀取），設定路徑後啟動時產生並在遊戲資料換版時重新產生
+VOYAGE_CALENDAR = os.getenv("VOYAGE_CALENDAR")
+VOYAGE_CALENDAR_DAYS = int(os.getenv("VOYAGE_CALENDAR_DAYS", 365))
+
+# 低記憶體模式: 只開指令需要的 intents，不快取成員、不在啟動時 chunk，訊息快取預設關閉
+LOW_MEMORY = os.getenv("LOW_MEMORY", "0") == "1"
+LOW_MEMORY_MAX_MESSAGES = int(os.getenv("LOW_MEMORY_MAX_MESSAGES", 0))  # 0 表示不快取訊息
+MEMORY_REPORT_MIN_INTERVAL = 60  # 記憶體報告的快取秒數
+MEMORY_TOP_MAX = 25              # memory 指令最多列出的伺服器數
+
+# 公告送出方式: bot（以 bot 帳號送出）或 webhook（每個公告頻道一個 webhook，各自的 rate limit）
+DELIVERY_TRANSPORT = os.getenv("DELIVERY_TRANSPORT", "bot")
+DELIVERY_CONCURRENCY = int(os.getenv("DELIVERY_CONCURRENCY", 10 if DELIVERY_TRANSPORT == "webhook" else 1))
+webhook_registry = WebhookRegistry(
+    redis_wrapper, os.getenv("WEBHOOK_NAME", "FF14 SeaFisher"), pool_size=max(DELIVERY_CONCURRENCY, 10),
+) if DELIVERY_TRANSPORT == "webhook" else None
+
+# Hot standby: 設為 1 時以 Redis lease 決定誰負責送出，其餘 instance 只保持快取更新
+HA_LEASE = os.getenv("HA_LEASE", "0") == "1"
+LEASE_RENEW_SECONDS = 5
+STANDBY_REFRESH_SECONDS = 60  # standby 重新載入監控採集清單的間隔
+leader_lease = LeaderLease(
+    redis_wrapper, ttl=float(os.getenv("LEASE_TTL", 15)), instance_id=os.getenv("INSTANCE_ID"),
+) if HA_LEASE else None
+
+# 斷線 / Redis 無法使用後的補發摘要
+CATCHUP_GAP_SECONDS = 90        # 排程超過這麼久沒有成功執行就視為中斷
+CATCHUP_LOCK_KEY = 'bot:catch_up_lock'  # 工作佇列模式下同一時間只有一個 worker 補發
+CATCHUP_LOCK_SECONDS = 10 * 60
+
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+VOYAGE_BOARDING_MINUTES = 15    # 出航後仍可登船的時間
+ORE_WINDOW_ET_HOURS = 2         # 限時採集點出現後持續的 ET 小時數
+job_queue = JobQueue(redis_wrapper)
+
+# event loop 延遲監控（秒）
+loop_watchdog = LoopWatchdog(
+    interval=float(os.getenv("LOOP_WATCHDOG_INTERVAL", 0.25)),
+    threshold=float(os.getenv("LOOP_WATCHDOG_THRESHOLD", 1.0)),
+    capacity=int(os.getenv("LOOP_WATCHDOG_CAPACITY", 20)),
+)
 
 
-async def remove_ore(name):
-    if await redis_wrapper.exists(f'channel:ore:{name}'):
-        await redis_wrapper.delete(f'channel:ore:{name}')
+# 每個伺服器的監控採集: ore:<guild_id> hash（採集名稱 -> {"time", "place"} JSON）
+# ore:guilds 記錄有設定監控採集的伺服器
+ore_index = OreIndex()
 
 
-async def set_ore(name, time, place):
-    await redis_wrapper.hset(f'channel:ore:{name}', mapping={'time': time, 'place': place})
+async def remove_ore(guild_id, name):
+    await redis_wrapper.hdel(f'ore:{guild_id}', name)
+    await redis_wrapper.incr(bulk_config.ORE_VERSION_KEY)  # 其他 instance 由 ore_config_watch_task 跟著重新載入
+    await refresh_ore_index(guild_id)
 
 
-async def get_ores():
-    ore_names = await redis_wrapper.keys('channel:ore:*')
-    ores = {}
+async def set_ore(guild_id, name, time, place):
+    await redis_wrapper.hset(f'ore:{guild_id}', name, json.dumps({'time': time, 'place': place}, ensure_ascii=False))
+    await redis_wrapper.sadd('ore:guilds', guild_id)
+    await redis_wrapper.incr(bulk_config.ORE_VERSION_KEY)
+    await refresh_ore_index(guild_id)
+
+
+async def get_ores(guild_id) -> Dict[str, dict]:
+    raw = await redis_wrapper.hgetall(f'ore:{guild_id}')
+    return {name: json.loads(value) for name, value in raw.items()}
+
+
+async def refresh_ore_index(guild_id):
+    ore_index.set_guild(guild_id, await get_ores(guild_id))
 
-    for name_key in ore_names:
-        ore = name_key.split(':')[-1]
-        ores[ore] = await redis_wrapper.hgetall(name_key)
-    
-    return ores
+
+async def load_ore_index():
+    await migrate_legacy_ores()
+    await reload_ore_index()
+    await migrate_legacy_ore_subscriptions()
+
+
+async def reload_ore_index():
+    guild_ids = await redis_wrapper.smembers('ore:guilds')
+    for guild_id in guild_ids:
+        try:
+            await refresh_ore_index(guild_id)
+        except Exception:
+            logger.exception("Error loading ores for guild %s; skip", guild_id)
+    for guild_id in set(ore_index.guilds) - set(guild_ids):
+        ore_index.remove_guild(guild_id)
+    logger.info("Loaded ore watchlists for %d guilds", len(ore_index.guilds))
+
+
+async def migrate_legacy_ores():
+    """
+    舊版的全域監控 channel:ore:<name> 複製到每個有採集公告頻道的伺服器後刪除。
+    舊版沒有驗證採集時間，格式錯誤的項目移到 ore:legacy_invalid hash 留待人工處理，不擋住啟動。
+    """
+    legacy_keys = await redis_wrapper.keys('channel:ore:*')
+    if not legacy_keys:
+        return
+
+    legacy = {}
+    for key in legacy_keys:
+        name = key.split(':', 2)[2]
+        ore_info = await redis_wrapper.hgetall(key)
+        try:
+            get_ore_hours(ore_info['time'])
+            if not ore_info.get('place'):
+                raise ValueError("missing place")
+        except (KeyError, ValueError) as e:
+            logger.warning("Legacy ore watch %r is invalid (%s); moved to ore:legacy_invalid", name, e)
+            await redis_wrapper.hset('ore:legacy_invalid', name, json.dumps(ore_info, ensure_ascii=False))
+            continue
+        legacy[name] = ore_info
+
+    for guild_id, channels in (await load_guild_channels()).items():
+        if 'ore' in channels.values():
+            for name, ore_info in legacy.items():
+                await set_ore(guild_id, name, ore_info['time'], ore_info['place'])
+    await redis_wrapper.delete(*legacy_keys)
+    logger.info("Migrated %d legacy ore watches to per-guild watchlists", len(legacy))
+
+
+# 每個公告頻道的提前通知時間（分鐘）: channel:lead hash（頻道 id -> "15,5"）
+async def get_all_lead_times() -> Dict[str, List[int]]:
+    """所有有設定的頻道；未列出的頻道使用 DEFAULT_LEAD_MINUTES"""
+    raw = await redis_wrapper.hgetall('channel:lead')
+    return {channel_id: [int(m) for m in value.split(',')] for channel_id, value in raw.items() if value}
+
+
+async def set_lead_times(channel_id, leads: List[int]):
+    await redis_wrapper.hset('channel:lead', str(channel_id), ','.join(str(m) for m in leads))
+
+
+# 每種 job 的 payload 必要欄位
+JOB_FIELDS = {
+    'fish': ('fire_at', 'voyage', 'channel'),
+    'fish_dm': ('fire_at', 'voyage'),
+    'ore': ('fire_at', 'start', 'guild', 'channel', 'lead'),
+    'ore_dm': ('fire_at', 'start'),
+}
+
+
+def job_deadline(payload: dict) -> Optional[float]:
+    """
+    job 失去意義的時間（epoch 秒）：海釣為出航時間、採集為可採集時段
+    （ORE_WINDOW_ET_HOURS 個 ET 小時）結束，與補發摘要判斷錯過的範圍一致。
+    payload 格式錯誤時回傳 None。
+    """
+    kind = payload.get('kind')
+    if kind not in JOB_FIELDS or not all(payload.get(name) for name in JOB_FIELDS[kind]):
+        return None
+    try:
+        if kind in ('fish', 'fish_dm'):
+            return get_voyage_time(int(payload['voyage'])).timestamp()
+        return float(payload['start']) + ORE_WINDOW_ET_HOURS * EORZEA_HOUR_EARTH_SECONDS
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def catch_up_key(payload: dict) -> Optional[tuple]:
+    """補發摘要涵蓋的 job 的比對鍵：(種類, 航班 / ET 日期時段, 頻道)"""
+    try:
+        if payload.get('kind') == 'fish':
+            return ('fish', str(payload['voyage']), str(payload['channel']))
+        if payload.get('kind') == 'ore':
+            et = convert_to_eorzea_time(datetime.fromtimestamp(float(payload['start']), tz=TIMEZONE))
+            return ('ore', et.get_datehour(), str(payload['channel']))
+    except (KeyError, TypeError, ValueError, OverflowError):
+        pass
+    return None
 
 
 async def get_channels(guild_id) -> Dict[str, str]:
@@ -218,7 +440,7 @@ async def get_channels(guild_id) -> Dict[str, str]:
         return {}
 
 
-async def load_channels() -> Tuple[List[str]]:
+async def load_guild_channels() -> Dict[str, Dict[str, str]]:
     guild_ids_key = 'channel:ids'
     try:
         guild_ids = await redis_wrapper.smembers(guild_ids_key)
@@ -230,23 +452,34 @@ async def load_channels() -> Tuple[List[str]]:
             guild_ids = await redis_wrapper.smembers(guild_ids_key)
         except Exception:
             logger.exception("Reconnect attempt failed")
-            return [], []
+            # 往上丟讓排程記錄這次失敗，恢復後由補發摘要處理
+            raise
 
-    fishes = []
-    ores = []
+    guilds = {}
 
     for guild_id in guild_ids or []:
         try:
-            channels = await redis_wrapper.hgetall(f'channel:{guild_id}')
-            for channel_id, channel_type in channels.items():
-                if channel_type == 'fish':
-                    fishes.append(channel_id)
-                else:
-                    ores.append(channel_id)
+            guilds[guild_id] = await redis_wrapper.hgetall(f'channel:{guild_id}')
         except Exception:
             logger.exception("Error reading channels for guild %s; skip", guild_id)
             continue
 
+    return guilds
+
+
+async def load_channels(guild_channels: Optional[Dict[str, Dict[str, str]]] = None) -> Tuple[List[str]]:
+    fishes = []
+    ores = []
+
+    if guild_channels is None:
+        guild_channels = await load_guild_channels()
+    for channels in guild_channels.values():
+        for channel_id, channel_type in channels.items():
+            if channel_type == 'fish':
+                fishes.append(channel_id)
+            else:
+                ores.append(channel_id)
+
     return fishes, ores
 
 
@@ -266,14 +499,102 @@ async def save_channels(guild_id, channel_id, new_type):
 
 
 async def remove_channel(guild_id, channel_id):
-    if await redis_wrapper.sismember('channel:ids', guild_id):
-        old_channels = await redis_wrapper.hgetall(f'channel:{guild_id}')
-        new_channels = {}
+    await redis_wrapper.hdel(f'channel:{guild_id}', str(channel_id))
+
+
+# ----- 個人訂閱（私訊通知）-----
+# 反向索引: sub:king:<海域>:<時段> / sub:ore:<伺服器 id>:<名稱> -> 使用者 id 集合
+#           （監控採集是每個伺服器各自設定，訂閱也跟著伺服器）
+#           sub:user:<使用者 id> -> 該使用者訂閱的索引 key（用於列出與取消）
+def king_key(area: str, time: str) -> str:
+    return f'sub:king:{area}:{time}'
+
+
+def ore_sub_key(guild_id, name: str) -> str:
+    return f'sub:ore:{guild_id}:{name}'
+
+
+def parse_ore_sub_key(key: str) -> Tuple[str, str]:
+    """sub:ore:<伺服器 id>:<名稱> -> (伺服器 id, 名稱)"""
+    _, _, guild_id, name = key.split(':', 3)
+    return guild_id, name
+
+
+async def migrate_legacy_ore_subscriptions():
+    """
+    舊版的全域訂閱 sub:ore:<名稱> 轉給目前監控該採集的每個伺服器（與舊版收到的通知相同），
+    之後新的訂閱都只屬於下指令的伺服器。需在 reload_ore_index 之後呼叫。
+    """
+    legacy_keys = [key for key in await redis_wrapper.keys('sub:ore:*') if not re.match(r'sub:ore:\d+:', key)]
+    for key in legacy_keys:
+        name = key.split(':', 2)[2]
+        guild_ids = [guild_id for guild_id, ores in ore_index.guilds.items() if name in ores]
+        for user_id in await redis_wrapper.smembers(key):
+            for guild_id in guild_ids:
+                await subscribe(user_id, ore_sub_key(guild_id, name))
+            await unsubscribe(user_id, key)
+        await redis_wrapper.delete(key)
+    if legacy_keys:
+        logger.info("Migrated %d legacy ore subscriptions to per-guild subscriptions", len(legacy_keys))
+
+
+async def subscribe(user_id, key):
+    await redis_wrapper.sadd(key, user_id)
+    await redis_wrapper.sadd(f'sub:user:{user_id}', key)
+
+
+async def unsubscribe(user_id, key):
+    await redis_wrapper.srem(key, user_id)
+    await redis_wrapper.srem(f'sub:user:{user_id}', key)
 
-        for c_id in old_channels.keys():
-            if c_id != channel_id:
-                new_channels[c_id] = old_channels[c_id]
-        await redis_wrapper.hset(f"channel:{guild_id}", mapping=new_channels)
+
+async def get_subscriptions(user_id) -> List[str]:
+    return sorted(await redis_wrapper.smembers(f'sub:user:{user_id}'))
+
+
+async def get_subscribers(keys) -> Dict[str, List[str]]:
+    """只讀取本次命中的索引 key，回傳 使用者 id -> 命中的 key"""
+    matched: Dict[str, List[str]] = {}
+    for key in keys:
+        for user_id in await redis_wrapper.smembers(key):
+            matched.setdefault(user_id, []).append(key)
+    return matched
+
+
+def parse_king(area: str, time: str) -> Optional[Tuple[str, str]]:
+    king = (area.upper(), time.upper())
+    if king not in game_data.current().kings:
+        return None
+    return king
+
+
+def king_list() -> str:
+    return ", ".join(f"`{area} {t}`" for area, t in game_data.current().kings)
+
+
+def missed_voyages(since: float, now: datetime) -> List[int]:
+    """公告時間落在 (since, now] 且仍可登船的航班"""
+    result = []
+    first = get_voyage_number(now - timedelta(minutes=VOYAGE_BOARDING_MINUTES))
+    for voyage in range(first, get_voyage_number(now + timedelta(minutes=SCHEDULE_LEAD_MINUTES)) + 1):
+        departure = get_voyage_time(voyage)
+        announce = departure - timedelta(minutes=SCHEDULE_LEAD_MINUTES)
+        if since < announce.timestamp() <= now.timestamp() and now < departure + timedelta(minutes=VOYAGE_BOARDING_MINUTES):
+            result.append(voyage)
+    return result
+
+
+def missed_ore_windows(since: float, now: datetime) -> List[datetime]:
+    """公告時間落在 (since, now] 且採集點仍在的 ET 小時（回傳開始的地球時間）"""
+    window = timedelta(seconds=ORE_WINDOW_ET_HOURS * EORZEA_HOUR_EARTH_SECONDS)
+    lead = timedelta(minutes=SCHEDULE_LEAD_MINUTES)
+    result = []
+    start = eorzea_hour_start(now - window)
+    while start <= now + lead:
+        if since < (start - lead).timestamp() <= now.timestamp() and now < start + window:
+            result.append(start)
+        start += timedelta(seconds=EORZEA_HOUR_EARTH_SECONDS)
+    return result
 
 
 async def get_authoritative_now(tz_name: str = "Asia/Taipei", http_session: ClientSession = None) -> datetime:
@@ -335,24 +656,72 @@ async def get_authoritative_now(tz_name: str = "Asia/Taipei", http_session: Clie
             await http_session.close()
 
 
+class SystemClock:
+    """排程器用的時鐘；simulate.py 以虛擬時鐘取代，快速重播多天的排程"""
+
+    async def now(self) -> datetime:
+        async with ClientSession() as session:
+            return await get_authoritative_now(tz_name="Asia/Taipei", http_session=session)
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
 class AnnounceBot(commands.Bot):
     _noticed = []
     _is_ore_run = False
     _is_fish_run = False
 
-    def __init__(self, command_prefix: str = "!", **options):
+    def __init__(self, command_prefix: str = "!", clock=None, **options):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.voice_states = False
+        if LOW_MEMORY:
+            # guilds: 頻道與權限檢查；messages / message_content: 指令
+            intents = discord.Intents.none()
+            intents.guilds = True
+            intents.guild_messages = True
+            intents.dm_messages = True
+            intents.message_content = True
+            options.setdefault('member_cache_flags', discord.MemberCacheFlags.none())
+            options.setdefault('chunk_guilds_at_startup', False)
+            options.setdefault('max_messages', LOW_MEMORY_MAX_MESSAGES or None)
         super().__init__(command_prefix=command_prefix, intents=intents, **options)
 
         self.is_ready = False
+        self._clock_offset = 0.0
+        self._connected = False
+        self._needs_catch_up = False
+        self._last_tick: Dict[str, float] = {}
+        self._standby_refreshed = 0.0
+        self._ore_version: Optional[str] = None
+        self.clock = clock or SystemClock()
+        # 有訂閱公告的頻道 id -> 送出用的頻道物件，每次載入頻道設定時重建
+        self._channel_registry: Dict[str, discord.abc.Messageable] = {}
+        self._memory_report: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._memory_report_lock = asyncio.Lock()
+        self._delivery_semaphore = asyncio.Semaphore(DELIVERY_CONCURRENCY)
 
     async def setup_hook(self):
         logger.info("SETUP HOOK")
 
-        self.fish_background_task.start()
-        self.ore_background_task.start()
+        await load_ore_index()
+        if VOYAGE_CALENDAR:
+            voyage_calendar.rebuild_on_change(VOYAGE_CALENDAR, VOYAGE_CALENDAR_DAYS, TIMEZONE)
+
+        if leader_lease is not None:
+            self.lease_task.start()
+
+        if USE_JOB_QUEUE:
+            self.job_planner_task.start()
+            self.job_worker_task.start()
+        else:
+            self.fish_background_task.start()
+            self.ore_background_task.start()
+        self.game_data_watch_task.start()
+        self.ore_config_watch_task.start()
+        if card_renderer is not None:
+            self.card_prerender_task.start()
 
         # 在 bot ready 之前把 Cog 加進來
         await self.add_cog(AnnounceCog(self))
@@ -361,52 +730,299 @@ class AnnounceBot(commands.Bot):
         logger.info(f"Logged in as {self.user} (id: {self.user.id})")
         logger.info("------")
         self.is_ready = True
+        if not self._last_tick:
+            # 重啟後從 Redis 取回上次成功排程的時間，補發重啟期間錯過的公告
+            await self._load_last_tick()
+        self._on_connected()
+
+    async def _load_last_tick(self):
+        try:
+            raw = await redis_wrapper.hgetall('bot:last_tick')
+            self._last_tick = {kind: float(ts) for kind, ts in raw.items()}
+        except Exception:
+            logger.exception("Failed to load last scheduler tick")
+
+    def _is_leader(self) -> bool:
+        return leader_lease is None or leader_lease.is_leader
+
+    async def _has_leadership(self) -> bool:
+        """送出一批公告前向 Redis 確認 lease（fencing）"""
+        return leader_lease is None or await leader_lease.validate()
+
+    async def on_message(self, message: discord.Message):
+        # standby 不回應指令，避免與 leader 重複回覆
+        if not self._is_leader():
+            return
+        if message.author.bot:
+            return
+        ctx = await self.get_context(message)
+        if ctx.command is None:
+            return
+        # 工作佇列模式下每個 worker 都會收到指令，只由搶到這則訊息的 worker 執行
+        if USE_JOB_QUEUE and not await redis_wrapper.set(f'cmd:{message.id}', '1', nx=True, ex=COMMAND_CLAIM_SECONDS):
+            return
+        await self.invoke(ctx)
+
+    @tasks.loop(seconds=LEASE_RENEW_SECONDS)
+    async def lease_task(self):
+        try:
+            was_leader = leader_lease.is_leader
+            if await leader_lease.acquire_or_renew():
+                if not was_leader:
+                    # 接手：以前任 leader 最後成功的排程時間為準，補發接手空窗期的公告
+                    await reload_ore_index()
+                    await self._load_last_tick()
+                    self._needs_catch_up = True
+            elif st.monotonic() - self._standby_refreshed > STANDBY_REFRESH_SECONDS:
+                # standby: 保持監控清單與快取為最新，隨時可以接手
+                await reload_ore_index()
+                self._standby_refreshed = st.monotonic()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Exception in lease_task")
+
+    def _on_connected(self):
+        self._connected = True
+        self._needs_catch_up = True
     
     @tasks.loop(seconds=30)
     async def ore_background_task(self):
         try:
-            # 每次進入這個 coroutine 都做一次完整檢查 -> tasks.loop 會在下一個 minute 再呼叫
-            async with ClientSession() as session:
-                now = await get_authoritative_now(tz_name="Asia/Taipei", http_session=session)
-                eorz_now = convert_to_eorzea_time(now)
-                eorz_5min = convert_to_eorzea_time(now + timedelta(minutes=5))
-                _, ore_channels = await load_channels()
-
-                logger.info(f"[Scheduler] [Ore] real now={now.isoformat()}, eor now={eorz_now}, check={eorz_5min}")
-                logger.debug(f"noticed list: {self._noticed}")
-
-                # 若還沒通知過此 eor 時段 -> 發送並記錄
-                if eorz_5min.get_datehour() not in self._noticed:
-                    if len(self._noticed) > 5:  # 多久的歷史要保留視需求調整
-                        self._noticed.pop(0)
-                    self._noticed.append(eorz_5min.get_datehour())
-                    await self._send_ore_announcement(eorz_5min, ore_channels)
-
+            # 每次進入這個 coroutine 都做一次完整檢查 -> tasks.loop 會在 30 秒後再呼叫
+            await self._ore_tick()
         except asyncio.CancelledError:
             # 被取消，向上丟出讓 tasks.loop 處理 (或在監護邏輯中重啟)
             raise
         except Exception:
             logger.exception("Exception in ore_background_task")
+            self._needs_catch_up = True
+
+    async def _ore_tick(self):
+        now = await self.clock.now()
+        eorz_now = convert_to_eorzea_time(now)
+        eorz_5min = convert_to_eorzea_time(now + timedelta(minutes=5))
+
+        logger.info(f"[Scheduler] [Ore] real now={now.isoformat()}, eor now={eorz_now}, check={eorz_5min}")
+        logger.debug(f"noticed list: {self._noticed}")
+
+        # 斷線期間不送，恢復後由補發摘要一次處理
+        if not self._connected:
+            return
+        if self._should_catch_up(now, 'ore'):
+            await self._catch_up(now)
+
+        # 若還沒通知過此 eor 時段 -> 發送並記錄
+        if eorz_5min.get_datehour() not in self._noticed:
+            if len(self._noticed) > 5:  # 多久的歷史要保留視需求調整
+                self._noticed.pop(0)
+            self._noticed.append(eorz_5min.get_datehour())
+            await self._send_ore_announcement(eorz_5min)
+
+        await self._mark_tick(now, 'ore')
 
     @tasks.loop(minutes=5)
     async def fish_background_task(self):
         try:
-            async with ClientSession() as session:
-                if not self.is_closed():
-                    now = await get_authoritative_now(tz_name="Asia/Taipei", http_session=session)
-                    next_run = self._next_schedule_after(now)
-                    wait_seconds = (next_run - now).total_seconds()
+            if not self.is_closed():
+                await self._fish_tick()
+        except Exception as ex:
+            logger.exception(ex)
+            self._needs_catch_up = True
+
+    async def _fish_tick(self):
+        now = await self.clock.now()
+        next_run = self._next_schedule_after(now)
+        wait_seconds = (next_run - now).total_seconds()
+
+        logger.info(f"[Scheduler] [Fish] now={now.isoformat()}, next={next_run.isoformat()}, wait={int(wait_seconds)}s")
+
+        fish_channels, _ = await self._load_channels()
+
+        if wait_seconds <= 300:
+            await self.clock.sleep(wait_seconds)
+            # 斷線中或已由補發摘要送過就跳過
+            if not self._connected or self._last_tick.get('fish', 0) >= next_run.timestamp():
+                return
+            await self._send_sea_announcement(next_run, fish_channels)
+            await self._mark_tick(next_run, 'fish')
+        elif self._connected and not self._needs_catch_up:
+            # 斷線期間與補發前都不更新，補發摘要才能從斷線前的時間算起
+            await self._mark_tick(now, 'fish')
+
+    @tasks.loop(seconds=JOB_PLAN_INTERVAL)
+    async def job_planner_task(self):
+        try:
+            now = await self.clock.now()
+            # worker 以系統時間 + 此偏移量判斷到期，不必每次都查詢網路時間
+            self._clock_offset = now.timestamp() - st.time()
+            count = await self._plan_jobs(now)
+            logger.info(f"[Scheduler] [Queue] now={now.isoformat()}, planned {count} new jobs")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Exception in job_planner_task")
+
+    @tasks.loop(seconds=5)
+    async def job_worker_task(self):
+        try:
+            # standby 不領取 job，留給 leader
+            if not self._connected or not self._is_leader():
+                return
+            now = st.time() + self._clock_offset
+            if self._should_catch_up(datetime.fromtimestamp(now, tz=TIMEZONE), 'ore'):
+                await self._queue_catch_up(datetime.fromtimestamp(now, tz=TIMEZONE))
+            await job_queue.requeue_expired(now)
+            limit = max(JOB_CLAIM_BATCH, DELIVERY_CONCURRENCY)
+            while batch := await job_queue.claim(st.time() + self._clock_offset, limit=limit):
+                in_flight = {job_id for job_id, _ in batch}
+                renew = asyncio.create_task(self._renew_jobs(in_flight))
+                try:
+                    await self._process_jobs(batch, in_flight)
+                finally:
+                    renew.cancel()
+            await self._mark_tick(datetime.fromtimestamp(now, tz=TIMEZONE), 'fish', 'ore')
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Exception in job_worker_task")
+            self._needs_catch_up = True
 
-                    logger.info(f"[Scheduler] [Fish] now={now.isoformat()}, next={next_run.isoformat()}, wait={int(wait_seconds)}s")
+    async def _renew_jobs(self, job_ids: Set[str]):
+        """處理一批 job 的期間，定期延長還沒處理完的 job 的逾時時間"""
+        while job_ids:
+            await asyncio.sleep(job_queue.visibility_timeout / 3)
+            await job_queue.extend(job_ids, st.time() + self._clock_offset)
 
-                    fish_channels, _ = await load_channels()
+    async def _process_jobs(self, jobs: List[Tuple[str, dict]], in_flight: Set[str]):
+        """平行處理一批 job（送出數量由 _send_to_channel 的 semaphore 限制），每筆完成就 ack"""
+        async def run(job_id, payload):
+            await self._process_job(job_id, payload)
+            in_flight.discard(job_id)
 
-                    if wait_seconds <= 300:
-                        await asyncio.sleep(wait_seconds)
-                        await self._send_sea_announcement(next_run, fish_channels)
+        await asyncio.gather(*(run(job_id, payload) for job_id, payload in jobs))
 
-        except Exception as ex:
-            logger.exception(ex)
+    async def _process_job(self, job_id: str, payload: dict):
+        """送出單一 job 後立即 ack；格式錯誤或已過期的 job 直接丟棄，不影響同批其他 job"""
+        try:
+            deadline = job_deadline(payload)
+            if deadline is None:
+                logger.warning("[Queue] drop malformed job %s: %r", job_id, payload)
+            elif st.time() + self._clock_offset > deadline:
+                logger.warning("[Queue] drop stale job %s", job_id)
+            else:
+                await self._run_job(payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("[Queue] job %s failed", job_id)
+        finally:
+            await job_queue.ack(job_id)
+
+    async def _plan_jobs(self, now: datetime) -> int:
+        """把未來 MAX_LEAD_MINUTES + 一個排程週期內要送出的公告排入佇列"""
+        horizon = now.timestamp() + MAX_LEAD_MINUTES * 60 + JOB_PLAN_INTERVAL * 2
+        guild_channels = await self._load_guild_channels()
+        lead_times = await get_all_lead_times()
+        jobs = []
+
+        def get_leads(channel_id):
+            return lead_times.get(channel_id, DEFAULT_LEAD_MINUTES)
+
+        async def plan(job_id, fire_at, payload):
+            if now.timestamp() <= fire_at <= horizon:
+                jobs.append((job_id, fire_at, {**payload, 'fire_at': fire_at}))
+
+        # 海釣: 每班船
+        voyage = get_voyage_number(now) + 1
+        while get_voyage_time(voyage).timestamp() <= horizon:
+            departure = get_voyage_time(voyage).timestamp()
+            for channels in guild_channels.values():
+                for channel_id, channel_type in channels.items():
+                    if channel_type != 'fish':
+                        continue
+                    for lead in get_leads(channel_id):
+                        await plan(f"fish:{voyage}:{channel_id}:{lead}", departure - lead * 60,
+                                   {'kind': 'fish', 'voyage': voyage, 'channel': channel_id})
+            await plan(f"fish_dm:{voyage}", departure - DEFAULT_LEAD_MINUTES[0] * 60,
+                       {'kind': 'fish_dm', 'voyage': voyage})
+            voyage += 1
+
+        # 採集: 只看有到點採集的伺服器
+        start = eorzea_hour_start(now) + timedelta(seconds=EORZEA_HOUR_EARTH_SECONDS)
+        while start.timestamp() <= horizon:
+            et = convert_to_eorzea_time(start)
+            due = ore_index.due(et.hour)
+            for guild_id in due:
+                for channel_id, channel_type in guild_channels.get(guild_id, {}).items():
+                    if channel_type != 'ore':
+                        continue
+                    for lead in get_leads(channel_id):
+                        await plan(f"ore:{et.get_datehour()}:{channel_id}:{lead}", start.timestamp() - lead * 60,
+                                   {'kind': 'ore', 'start': start.timestamp(), 'guild': guild_id,
+                                    'channel': channel_id, 'lead': lead})
+            if due:
+                await plan(f"ore_dm:{et.get_datehour()}", start.timestamp() - DEFAULT_LEAD_MINUTES[0] * 60,
+                           {'kind': 'ore_dm', 'start': start.timestamp()})
+            start += timedelta(seconds=EORZEA_HOUR_EARTH_SECONDS)
+
+        return await job_queue.schedule_many(jobs)
+
+    async def _run_job(self, payload: dict):
+        """payload 需先經 job_deadline 檢查格式"""
+        if not await self._has_leadership():
+            return
+        kind = payload['kind']
+        if kind in ('fish', 'fish_dm'):
+            voyage = get_voyage_info(payload['voyage'])
+            message = render_bait(voyage)
+            if kind == 'fish':
+                await self._send_voyage(voyage, message, [payload['channel']])
+            else:
+                await self._send_king_dms(voyage, message)
+        elif kind in ('ore', 'ore_dm'):
+            et = convert_to_eorzea_time(datetime.fromtimestamp(payload['start'], tz=TIMEZONE))
+            due = ore_index.due(et.hour)
+            if kind == 'ore':
+                # 以送出當下的監控清單為準，期間被移除的採集就不送
+                ore_list = due.get(payload['guild'])
+                if ore_list:
+                    await self._send_to_channel(payload['channel'], render_ore(et, ore_list, payload['lead']), 'ore')
+            else:
+                await self._send_ore_dms(et, due)
+
+    @tasks.loop(minutes=10)
+    async def card_prerender_task(self):
+        # 在 process pool 中預先畫好接下來幾班船的圖卡，送出時不需要在 event loop 上繪圖
+        try:
+            first = get_voyage_number(datetime.now(tz=TIMEZONE)) + 1
+            for voyage in range(first, first + CARD_AHEAD_VOYAGES):
+                await card_renderer.ensure(get_voyage_info(voyage))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Exception in card_prerender_task")
+
+    @tasks.loop(seconds=30)
+    async def game_data_watch_task(self):
+        # game_data.json 有修改就熱更新，不需要重啟
+        try:
+            game_data.reload_if_changed()
+        except Exception:
+            logger.exception("Failed to reload game data; keep current version %s", game_data.current().version)
+
+    @tasks.loop(seconds=30)
+    async def ore_config_watch_task(self):
+        # CLI 或其他 instance 匯入設定後會遞增 ore:version，這裡跟著重新載入監控採集
+        try:
+            version = await redis_wrapper.get(bulk_config.ORE_VERSION_KEY)
+            if version != self._ore_version:
+                await reload_ore_index()
+                self._ore_version = version
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Exception in ore_config_watch_task")
 
     @fish_background_task.before_loop
     async def before_fish_task(self):
@@ -416,6 +1032,38 @@ class AnnounceBot(commands.Bot):
     async def before_ore_task(self):
         await self.wait_until_ready()
 
+    @job_planner_task.before_loop
+    async def before_job_planner_task(self):
+        await self.wait_until_ready()
+
+    @job_worker_task.before_loop
+    async def before_job_worker_task(self):
+        await self.wait_until_ready()
+
+    # 頻道設定的讀取集中在這裡，模擬時改由記憶體提供
+    async def _load_guild_channels(self) -> Dict[str, Dict[str, str]]:
+        guild_channels = await load_guild_channels()
+        self._update_channel_registry(guild_channels)
+        return guild_channels
+
+    async def _load_channels(self) -> Tuple[List[str]]:
+        return await load_channels(await self._load_guild_channels())
+
+    async def _get_channels(self, guild_id) -> Dict[str, str]:
+        return await get_channels(guild_id)
+
+    def _update_channel_registry(self, guild_channels: Dict[str, Dict[str, str]]):
+        """只保留目前有訂閱的頻道；低記憶體模式下用 PartialMessageable，不依賴 guild 快取"""
+        registry = {}
+        for channels in guild_channels.values():
+            for channel_id in channels:
+                channel = self._channel_registry.get(channel_id)
+                if channel is None and LOW_MEMORY:
+                    channel = self.get_partial_messageable(int(channel_id))
+                if channel is not None:
+                    registry[channel_id] = channel
+        self._channel_registry = registry
+
     def _next_schedule_after(self, now: datetime) -> datetime:
         today = now.date()
         candidates = []
@@ -429,48 +1077,280 @@ class AnnounceBot(commands.Bot):
         return datetime.combine(tomorrow, time(hour=SCHEDULE_HOURS[0], minute=SCHEDULE_MINUTE, second=0), tzinfo=TIMEZONE)
 
     async def _send_sea_announcement(self, run_time: datetime, fish_channels):
-        message = get_bait(run_time)
-        for channel_id in fish_channels:
+        if not await self._has_leadership():
+            return
+        voyage = get_voyage(run_time)
+        message = render_bait(voyage)
+        await self._send_voyage(voyage, message, fish_channels)
+
+        await self._send_king_dms(voyage, message)
+
+    async def _send_voyage(self, voyage: dict, message: str, fish_channels):
+        """
+        有預先畫好的圖卡就送圖卡。圖卡先讀進記憶體再逐頻道上傳：
+        快取檔可能已被清掉，而上傳後的 CDN 網址有簽章會過期、原訊息刪除後也會失效，不能跨頻道沿用。
+        """
+        card = card_renderer.cache.get(voyage['voyage'], voyage['data_version']) if card_renderer else None
+        data = None
+        if card is not None:
             try:
-                channel = self.get_channel(channel_id)
-                if channel is None:
-                    try:
-                        channel = await self.fetch_channel(channel_id)
-                    except Exception:
-                        channel = None
-                if channel is None:
-                    continue
-                timestamp = run_time.astimezone(TIMEZONE).strftime("%Y-%m-%d %H:%M:%S %Z")
-                await channel.send(message)
-                logger.info(f"[Info] sent fish announcement to {channel_id}")
-            except Exception as e:
-                logger.warning(f"[Error] sending to {channel_id}: {e}")
-    
-    async def _send_ore_announcement(self, fivemin_time: EorzeaTime, ore_channels):
-        message = get_ore(fivemin_time, await get_ores())
-        if len(message) == 0:
+                data = card.read_bytes()
+            except OSError as e:
+                logger.warning(f"[Card] cannot read {card}, send text instead: {e}")
+        if data is None:
+            await self._broadcast([(channel_id, message) for channel_id in fish_channels], 'fish')
             return
-        
-        for channel_id in ore_channels:
+
+        caption = message.split("\n", 1)[0]
+        await self._broadcast(
+            [(channel_id, caption) for channel_id in fish_channels], 'fish',
+            make_file=lambda: discord.File(io.BytesIO(data), filename=card.name),
+        )
+
+    async def _broadcast(self, sends: List[Tuple[str, str]], kind: str, **kwargs):
+        """(頻道, 訊息) 平行送出，同時送出的數量由 _send_to_channel 限制在 DELIVERY_CONCURRENCY"""
+        await asyncio.gather(*(self._send_to_channel(channel_id, message, kind, **kwargs) for channel_id, message in sends))
+
+    async def _send_to_channel(self, channel_id, message: str, kind: str, **kwargs) -> Optional[discord.Message]:
+        """
+        廣播與工作佇列的 job 共用同一個 semaphore，整個 instance 最多同時送出 DELIVERY_CONCURRENCY 則；
+        webhook 模式下每個頻道有自己的 rate limit，可以平行送出
+        """
+        async with self._delivery_semaphore:
+            return await self._deliver(channel_id, message, kind, **kwargs)
+
+    async def _deliver(self, channel_id, message: str, kind: str,
+                       make_file: Optional[Callable[[], discord.File]] = None, **kwargs) -> Optional[discord.Message]:
+        """make_file: 每次送出時產生新的附檔（discord.File 送出後就會被關閉，不能重用）"""
+        if not self._is_leader():
+            return None
+        if webhook_registry is not None:
             try:
-                channel = self.get_channel(channel_id)
-                if channel is None:
-                    try:
-                        channel = await self.fetch_channel(channel_id)
-                    except Exception:
-                        channel = None
-                if channel is None:
-                    continue
-                await channel.send(message)
-                logger.info(f"[Info] sent ore announcement to {channel_id}")
+                sent = await webhook_registry.send(
+                    channel_id, lambda: self._fetch_guild_channel(channel_id), message, make_file=make_file,
+                    username=self.user.display_name, avatar_url=self.user.display_avatar.url, **kwargs,
+                )
+                logger.info(f"[Info] sent {kind} announcement to {channel_id} via webhook")
+                return sent
+            except (discord.Forbidden, discord.NotFound, PermissionError, LookupError) as e:
+                # 沒有管理 Webhook 權限、webhook 無法建立等情況改用 bot 帳號送出
+                logger.warning(f"[Webhook] cannot use webhook for {channel_id}, fall back to bot: {e}")
             except Exception as e:
-                logger.warning(f"[Error] sending to {channel_id}: {e}")
+                # 逾時等錯誤時 Discord 可能已經收到訊息，改用 bot 重送會重複公告
+                logger.warning(f"[Error] sending to {channel_id} via webhook: {e}")
+                return None
+        try:
+            channel = self._channel_registry.get(str(channel_id)) or await self._fetch_guild_channel(channel_id)
+            if channel is None:
+                return None
+            sent = await channel.send(message, **({'file': make_file()} if make_file else {}), **kwargs)
+            self._channel_registry.setdefault(str(channel_id), channel)
+            logger.info(f"[Info] sent {kind} announcement to {channel_id}")
+            return sent
+        except Exception as e:
+            logger.warning(f"[Error] sending to {channel_id}: {e}")
+            return None
+
+    async def _fetch_guild_channel(self, channel_id):
+        channel = self.get_channel(int(channel_id))
+        if channel is None:
+            try:
+                channel = await self.fetch_channel(int(channel_id))
+            except Exception:
+                channel = None
+        return channel
+
+    async def _send_king_dms(self, voyage: dict, message: str):
+        kings = get_kings(voyage)
+        subscribers = await get_subscribers([king_key(area, t) for area, t in kings])
+        if not subscribers:
+            return
+
+        def render(keys):
+            names = [f"{key.split(':')[2]}（{TIME_CHT[key.split(':')[3]]}）" for key in keys]
+            return f"你訂閱的幻海海王即將出現: {', '.join(names)}\n{message}"
+
+        await self._send_dms({user_id: render(keys) for user_id, keys in subscribers.items()})
+
+    async def _send_ore_dms(self, fivemin_time: EorzeaTime, due: Dict[str, List[Tuple[str, str]]]):
+        """due: 伺服器 id -> 這個 ET 小時到點的 (採集名稱, 地點)；只通知在該伺服器訂閱的使用者"""
+        places = {
+            ore_sub_key(guild_id, name): place
+            for guild_id, ore_list in due.items() for name, place in ore_list
+        }
+        subscribers = await get_subscribers(list(places))
+        if not subscribers:
+            return
+
+        def render(keys):
+            lines = []
+            for key in keys:
+                guild_id, name = parse_ore_sub_key(key)
+                lines.append(f"{name} ( {places[key]} ) — {self._guild_name(guild_id)}")
+            return "\n".join([f"5分鐘後限時採集--{fivemin_time.hour:02d}:00", *lines])
+
+        await self._send_dms({user_id: render(keys) for user_id, keys in subscribers.items()})
+
+    def _guild_name(self, guild_id) -> str:
+        guild = self.get_guild(int(guild_id)) if str(guild_id).isdigit() else None
+        return guild.name if guild is not None else str(guild_id)
+
+    async def _send_dms(self, messages: Dict[str, str]):
+        """每位使用者只送一則私訊；同時送出的數量以 DM_CONCURRENCY 限制"""
+        semaphore = asyncio.Semaphore(DM_CONCURRENCY)
+
+        async def send(user_id, message):
+            async with semaphore:
+                if not self._is_leader():
+                    return
+                try:
+                    user = self.get_user(int(user_id)) or await self.fetch_user(int(user_id))
+                    await user.send(message)
+                    logger.info(f"[Info] sent dm to {user_id}")
+                except Exception as e:
+                    logger.warning(f"[Error] sending dm to {user_id}: {e}")
+
+        await asyncio.gather(*(send(user_id, message) for user_id, message in messages.items()))
+    
+    async def _send_ore_announcement(self, fivemin_time: EorzeaTime):
+        if not await self._has_leadership():
+            return
+        # 只處理這個 ET 小時有到點採集的伺服器
+        due = ore_index.due(fivemin_time.hour)
+        if not due:
+            return
+
+        await self._send_ore_dms(fivemin_time, due)
+
+        sends = []
+        for guild_id, ore_list in list(due.items()):
+            message = render_ore(fivemin_time, ore_list)
+            channels = await self._get_channels(guild_id)
+            for channel_id, channel_type in channels.items():
+                if channel_type == 'ore':
+                    sends.append((channel_id, message))
+        await self._broadcast(sends, 'ore')
     
     async def on_disconnect(self):
         logger.warning("on_disconnect called")
+        self._connected = False
 
     async def on_resumed(self):
         logger.info("on_resumed called")
+        self._on_connected()
+
+    async def _mark_tick(self, now: datetime, *kinds: str):
+        if not self._is_leader():
+            return
+        for kind in kinds:
+            self._last_tick[kind] = now.timestamp()
+        await redis_wrapper.hset('bot:last_tick', mapping={kind: now.timestamp() for kind in kinds})
+
+    def _should_catch_up(self, now: datetime, kind: str) -> bool:
+        last = self._last_tick.get(kind)
+        gap = last is not None and now.timestamp() - last > CATCHUP_GAP_SECONDS
+        return self._needs_catch_up or gap
+
+    async def _queue_catch_up(self, now: datetime):
+        """
+        工作佇列模式下是否中斷由整個叢集決定：所有 worker 都會更新 Redis 的 bot:last_tick，
+        取得 lock 後以共用的 last tick 判斷，只要有 worker 持續在跑就不補發；
+        同時重新連線的多個 worker 也只會有一個送出摘要。
+        """
+        token = uuid.uuid4().hex
+        if not await redis_wrapper.set(CATCHUP_LOCK_KEY, token, nx=True, ex=CATCHUP_LOCK_SECONDS):
+            # 其他 worker 正在補發
+            self._needs_catch_up = False
+            return
+        try:
+            await self._load_last_tick()
+            if self._should_catch_up_cluster(now):
+                await self._catch_up(now)
+            self._needs_catch_up = False
+        finally:
+            await redis_wrapper.eval(_RELEASE_LOCK, 1, CATCHUP_LOCK_KEY, token)
+
+    def _should_catch_up_cluster(self, now: datetime) -> bool:
+        last = self._last_tick.get('ore')
+        return last is not None and now.timestamp() - last > CATCHUP_GAP_SECONDS
+
+    async def _catch_up(self, now: datetime):
+        """
+        中斷期間錯過、但仍有用的航班與採集，每個頻道合併成一則摘要送出，
+        送出的訊息數不會超過頻道數。
+        工作佇列模式下先領取已到期的 job，摘要涵蓋的（同航班 / 同 ET 小時且同頻道）直接 ack，
+        其他（私訊、摘要以外的航班）照常送出。
+        """
+        if not await self._has_leadership():
+            return
+        claimed = []
+        in_flight: Set[str] = set()
+        renew = None
+        if USE_JOB_QUEUE:
+            while batch := await job_queue.claim(now.timestamp(), limit=JOB_CLAIM_BATCH):
+                claimed.extend(batch)
+                in_flight.update(job_id for job_id, _ in batch)
+            renew = asyncio.create_task(self._renew_jobs(in_flight))
+        try:
+            await self._send_catch_up(now, claimed, in_flight)
+        finally:
+            if renew is not None:
+                renew.cancel()
+
+    async def _send_catch_up(self, now: datetime, claimed: List[Tuple[str, dict]], in_flight: Set[str]):
+        covered = set()
+        voyages = missed_voyages(self._last_tick['fish'], now) if 'fish' in self._last_tick else []
+        ore_windows = missed_ore_windows(self._last_tick['ore'], now) if 'ore' in self._last_tick else []
+        logger.info(f"[CatchUp] now={now.isoformat()}, voyages={voyages}, ore windows={[w.isoformat() for w in ore_windows]}")
+
+        fish_message = None
+        if voyages:
+            fish_message = "\n".join(["（連線中斷期間錯過的海釣公告）"] + [render_bait(get_voyage_info(v)) for v in voyages])
+
+        ets = [convert_to_eorzea_time(start) for start in ore_windows]
+        for et in ets:
+            if et.get_datehour() not in self._noticed:
+                self._noticed.append(et.get_datehour())
+        del self._noticed[:-6]
+
+        for guild_id, channels in (await self._load_guild_channels()).items():
+            ore_lines = []
+            for et, start in zip(ets, ore_windows):
+                ore_list = ore_index.due(et.hour).get(guild_id)
+                if ore_list:
+                    ore_lines.append(f"採集時間--{et.hour:02d}:00（地球時間 {start.astimezone(TIMEZONE).strftime('%H:%M')}）")
+                    ore_lines.extend(f'{ore} ( {place} )' for ore, place in ore_list)
+
+            for channel_id, channel_type in channels.items():
+                if channel_type == 'fish' and fish_message:
+                    await self._send_to_channel(channel_id, fish_message, 'fish catch-up')
+                    covered.update(('fish', str(v), channel_id) for v in voyages)
+                elif channel_type == 'ore' and ore_lines:
+                    await self._send_to_channel(channel_id, "\n".join(["連線中斷期間錯過的限時採集:"] + ore_lines), 'ore catch-up')
+                    covered.update(('ore', et.get_datehour(), channel_id) for et in ets)
+
+        for job_id, payload in claimed:
+            if catch_up_key(payload) in covered:
+                await job_queue.ack(job_id)
+                in_flight.discard(job_id)
+        await self._process_jobs([(job_id, payload) for job_id, payload in claimed if job_id in in_flight], in_flight)
+
+        self._needs_catch_up = False
+        await self._mark_tick(now, 'fish', 'ore')
+
+    async def memory_report(self) -> Dict[str, Any]:
+        """走訪整個快取很花時間，MEMORY_REPORT_MIN_INTERVAL 秒內重複查詢直接回傳上次的結果"""
+        async with self._memory_report_lock:
+            if self._memory_report is None or st.monotonic() - self._memory_report[0] >= MEMORY_REPORT_MIN_INTERVAL:
+                report = await memory_report(
+                    self,
+                    low_memory=LOW_MEMORY,
+                    intents=[name for name, enabled in self.intents if enabled],
+                    max_messages=self._connection.max_messages,
+                    channel_registry=len(self._channel_registry),
+                )
+                self._memory_report = (st.monotonic(), report)
+            return self._memory_report[1]
 
     async def on_error(self, event, *args, **kwargs):
         logger.exception("on_error: %s", event)
@@ -514,7 +1394,9 @@ class AnnounceCog(commands.Cog):
         channel_id = ctx.channel.id
         if str(channel_id) in channels:
             await remove_channel(guild_id, channel_id)
-            await ctx.send("已取消此頻道 <#{channel_id}> 的公告頻道設定。")
+            if webhook_registry is not None:
+                await webhook_registry.remove(channel_id)
+            await ctx.send(f"已取消此頻道 <#{channel_id}> 的公告頻道設定。")
         else:
             await ctx.send("此頻道非本伺服器的公告頻道。")
 
@@ -549,24 +1431,211 @@ class AnnounceCog(commands.Cog):
     async def get_source(self, ctx: commands.Context):
         await ctx.send(get_source())
     
-    @commands.command(name="set_ore", help="set_ore <name> <time:int> <place>  — 設定或更新一個監控礦物")
+    @commands.command(name="set_ore", help="set_ore <name> <time:int> <place>  — 設定或更新本伺服器的監控採集（需具管理伺服器或管理員權限）")
+    @commands.has_guild_permissions(manage_guild=True)
     async def set_ore(self, ctx: commands.Context, name: str, time: str, place: str):
-        await set_ore(name, time, place)
+        try:
+            get_ore_hours(time)
+        except ValueError:
+            await ctx.send("採集時間格式錯誤，請輸入 0~23 的 ET 小時，多個時間以逗號分隔（例如 `6,18`）。")
+            return
+        await set_ore(str(ctx.guild.id), name, time, place)
         await ctx.send(f"已設定 `{name}` => {{'time': {time}, 'place': '{place}'}}。")
 
-    @commands.command(name="remove_ore", help="remove_ore <name>  — 移除監控採集")
+    @commands.command(name="remove_ore", help="remove_ore <name>  — 移除本伺服器的監控採集（需具管理伺服器或管理員權限）")
+    @commands.has_guild_permissions(manage_guild=True)
     async def remove_ore(self, ctx: commands.Context, name: str):
-        await remove_ore(name)
+        await remove_ore(str(ctx.guild.id), name)
         await ctx.send(f"已移除 `{name}` 的採集監控。")
     
-    @commands.command(name="list_ore", help="檢視所有監控採集")
+    @commands.command(name="ore_api_token", help="以私訊取得本伺服器 /api/ores 的存取 token（需具管理伺服器或管理員權限）")
+    @commands.has_guild_permissions(manage_guild=True)
+    async def ore_api_token(self, ctx: commands.Context):
+        if not API_SECRET:
+            await ctx.send("尚未設定 API_SECRET，/api/ores 目前停用。")
+            return
+        guild_id = str(ctx.guild.id)
+        try:
+            await ctx.author.send(f"/api/ores?guild={guild_id}&token={ore_api_token(guild_id)}")
+        except discord.HTTPException:
+            await ctx.send("無法私訊給你，請開啟伺服器成員私訊。")
+            return
+        await ctx.send("已私訊 token。")
+
+    @commands.command(name="list_ore", help="檢視本伺服器所有監控採集")
+    @commands.guild_only()
     async def list_ore(self, ctx: commands.Context):
-        ores = await get_ores()
+        ores = await get_ores(str(ctx.guild.id))
         messages = ["目前監控採集:"]
         for ore, ore_info in ores.items():
             messages.append(f"已設定 `{ore}` => 採集時間: `{ore_info['time']}` , 採集地區: `{ore_info['place']}`。")
         await ctx.send("\n".join(messages))
 
+    @commands.command(
+        name="set_lead_times",
+        help="set_lead_times <分鐘> [分鐘...]  — 設定此公告頻道提前幾分鐘通知，例如 `15 5`（需具管理伺服器或管理員權限）"
+    )
+    @commands.has_guild_permissions(manage_guild=True)
+    async def set_lead_times(self, ctx: commands.Context, *leads: int):
+        channels = await get_channels(str(ctx.guild.id))
+        if str(ctx.channel.id) not in channels:
+            await ctx.send("此頻道非本伺服器的公告頻道。")
+            return
+        if not leads or any(not 1 <= m <= MAX_LEAD_MINUTES for m in leads):
+            await ctx.send(f"請輸入 1~{MAX_LEAD_MINUTES} 分鐘，例如 `set_lead_times 15 5`。")
+            return
+        leads = sorted(set(leads), reverse=True)
+        await set_lead_times(ctx.channel.id, leads)
+        message = f"已將此頻道設為出發前 {', '.join(str(m) for m in leads)} 分鐘通知。"
+        if not USE_JOB_QUEUE:
+            # 預設排程固定提前 SCHEDULE_LEAD_MINUTES 分鐘，設定會保留到啟用工作佇列時生效
+            message += f"\n注意：目前未啟用工作佇列（USE_JOB_QUEUE），仍固定於 {SCHEDULE_LEAD_MINUTES} 分鐘前通知，此設定暫不生效。"
+        await ctx.send(message)
+
+    @commands.command(
+        name="export_config",
+        help="export_config [json/csv]  — 匯出本伺服器的公告頻道與監控採集設定（需具管理伺服器或管理員權限）"
+    )
+    @commands.has_guild_permissions(manage_guild=True)
+    async def export_config(self, ctx: commands.Context, fmt: str = "json"):
+        if fmt not in bulk_config.FORMATS:
+            await ctx.send("格式請輸入 `json` 或 `csv`。")
+            return
+        guild_id = str(ctx.guild.id)
+        config = await bulk_config.export_config(redis_wrapper, [guild_id])
+        data = bulk_config.format_config(config, fmt)
+        await ctx.send("本伺服器目前的設定:", file=discord.File(io.BytesIO(data), filename=f"config-{guild_id}.{fmt}"))
+
+    @commands.command(
+        name="import_config",
+        help="import_config [replace]  — 附上 .json / .csv 檔匯入本伺服器的設定，replace 會先清除原有設定（需具管理伺服器或管理員權限）"
+    )
+    @commands.has_guild_permissions(manage_guild=True)
+    async def import_config(self, ctx: commands.Context, mode: str = ""):
+        if not ctx.message.attachments:
+            await ctx.send("請附上 export_config 匯出的 .json 或 .csv 檔。")
+            return
+        attachment = ctx.message.attachments[0]
+        fmt = bulk_config.guess_format(attachment.filename)
+        if fmt is None or attachment.size > IMPORT_MAX_BYTES:
+            await ctx.send(f"只接受 {IMPORT_MAX_BYTES // 1024 // 1024} MB 以內的 .json 或 .csv 檔。")
+            return
+
+        guild_id = str(ctx.guild.id)
+        try:
+            config = bulk_config.parse_config(
+                await attachment.read(), fmt, default_guild=guild_id, only_guild=guild_id,
+                max_lead_minutes=MAX_LEAD_MINUTES,
+            )
+            unknown = [c for g in config.values() for c in g.channels if ctx.guild.get_channel(int(c)) is None]
+            if unknown:
+                raise bulk_config.ConfigError([f"channel {c} is not in this server" for c in unknown])
+        except bulk_config.ConfigError as e:
+            await ctx.send(f"匯入失敗，沒有寫入任何設定（{len(e.errors)} 個錯誤）:\n```\n{str(e)[:1800]}\n```")
+            return
+
+        result = await bulk_config.import_config(redis_wrapper, config, replace=mode == "replace")
+        await refresh_ore_index(guild_id)
+        await ctx.send(f"已匯入 {result['channels']} 個公告頻道與 {result['ores']} 筆監控採集。")
+
+    @commands.command(name="reload_game_data", help="重新載入遊戲資料檔（限 bot 擁有者）")
+    @commands.is_owner()
+    async def reload_game_data(self, ctx: commands.Context):
+        old_version = game_data.current().version
+        try:
+            diff = game_data.reload_game_data()
+        except game_data.GameDataError as e:
+            await ctx.send(f"遊戲資料載入失敗，維持版本 {old_version}: {e}")
+            return
+        if not diff.changed:
+            await ctx.send(f"遊戲資料沒有變動（版本 {diff.new_version}）。")
+            return
+        await ctx.send(
+            f"遊戲資料已由版本 {diff.old_version} 更新為 {diff.new_version}: "
+            f"{len(diff.changed_stops)} 個釣場變動, 航線{'有' if diff.routes_changed else '無'}變動, "
+            f"魚餌取得方式{'有' if diff.sources_changed else '無'}變動。"
+        )
+
+    @commands.command(name="memory", help="顯示記憶體用量與佔用最多的伺服器（限 bot 擁有者）")
+    @commands.is_owner()
+    async def memory(self, ctx: commands.Context, top: int = 10):
+        top = min(max(top, 1), MEMORY_TOP_MAX)
+        report = await self.bot.memory_report()
+        lines = [
+            f"RSS {report['rss'] / 1024 / 1024:.1f} MiB, {report['guild_count']} 個伺服器約 "
+            f"{report['guild_bytes'] / 1024 / 1024:.1f} MiB, 快取訊息 {report['cached_messages']} 則"
+            f"（低記憶體模式{'開啟' if LOW_MEMORY else '關閉'}）"
+        ]
+        for g in report['guilds'][:top]:
+            line = (
+                f"`{g['name'][:40]}` ({g['guild']}): {g['bytes'] / 1024:.0f} KiB — "
+                f"成員 {g['members']}, 頻道 {g['channels']}, 訊息 {g['messages']}"
+            )
+            # Discord 訊息上限 2000 字
+            if sum(len(l) + 1 for l in lines) + len(line) > 2000:
+                break
+            lines.append(line)
+        await ctx.send("\n".join(lines))
+
+    @commands.command(name="subscribe_king", help="subscribe_king <海域> <D/S/N>  — 幻海海王出現前私訊通知")
+    async def subscribe_king(self, ctx: commands.Context, area: str, time: str):
+        king = parse_king(area, time)
+        if king is None:
+            await ctx.send(f"沒有這個幻海海王，可訂閱: {king_list()}")
+            return
+        await subscribe(str(ctx.author.id), king_key(*king))
+        await ctx.send(f"已訂閱 `{king[0]} {king[1]}` 幻海海王，將以私訊通知。")
+
+    @commands.command(name="unsubscribe_king", help="unsubscribe_king <海域> <D/S/N>  — 取消幻海海王私訊通知")
+    async def unsubscribe_king(self, ctx: commands.Context, area: str, time: str):
+        king = parse_king(area, time)
+        if king is None:
+            await ctx.send(f"沒有這個幻海海王，可訂閱: {king_list()}")
+            return
+        await unsubscribe(str(ctx.author.id), king_key(*king))
+        await ctx.send(f"已取消訂閱 `{king[0]} {king[1]}` 幻海海王。")
+
+    @commands.command(name="subscribe_ore", help="subscribe_ore <name>  — 本伺服器監控的限時採集出現前私訊通知")
+    @commands.guild_only()
+    async def subscribe_ore(self, ctx: commands.Context, name: str):
+        watched = ore_index.guilds.get(str(ctx.guild.id), {})
+        if name not in watched:
+            names = ", ".join(f"`{ore}`" for ore in watched) or "（尚未設定，請先使用 set_ore）"
+            await ctx.send(f"本伺服器沒有監控 `{name}`，可訂閱: {names}")
+            return
+        await subscribe(str(ctx.author.id), ore_sub_key(ctx.guild.id, name))
+        await ctx.send(f"已訂閱 `{name}` 的限時採集，將以私訊通知。")
+
+    @commands.command(name="unsubscribe_ore", help="unsubscribe_ore <name>  — 取消限時採集私訊通知")
+    async def unsubscribe_ore(self, ctx: commands.Context, name: str):
+        user_id = str(ctx.author.id)
+        if ctx.guild is not None:
+            keys = [ore_sub_key(ctx.guild.id, name)]
+        else:
+            # 私訊中取消所有伺服器的同名訂閱
+            keys = [key for key in await get_subscriptions(user_id)
+                    if key.startswith('sub:ore:') and parse_ore_sub_key(key)[1] == name]
+        for key in keys:
+            await unsubscribe(user_id, key)
+        await ctx.send(f"已取消訂閱 `{name}` 的限時採集。")
+
+    @commands.command(name="list_subscription", help="檢視自己的私訊訂閱")
+    async def list_subscription(self, ctx: commands.Context):
+        keys = await get_subscriptions(str(ctx.author.id))
+        if not keys:
+            await ctx.send("目前沒有任何訂閱。")
+            return
+        messages = ["目前訂閱:"]
+        for key in keys:
+            _, kind, rest = key.split(':', 2)
+            if kind == 'king':
+                area, t = rest.split(':')
+                messages.append(f"幻海海王 `{area} {t}`（{TIME_CHT[t]}）")
+            else:
+                guild_id, name = parse_ore_sub_key(key)
+                messages.append(f"限時採集 `{name}`（{self.bot._guild_name(guild_id)}）")
+        await ctx.send("\n".join(messages))
+
 
 # ---------- 啟動 ----------
 
@@ -574,9 +1643,137 @@ class AnnounceCog(commands.Cog):
 async def handle_ok(request):
     return web.Response(text="OK")
 
-async def start_http_server(port: int):
+def _check_debug_access(request):
+    """/debug/* 會洩漏 stack 與伺服器資訊，限 DEBUG_TOKEN 或本機存取"""
+    if DEBUG_TOKEN:
+        auth = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(auth.encode(), f"Bearer {DEBUG_TOKEN}".encode()):
+            raise web.HTTPUnauthorized(text="debug token required")
+    elif request.remote not in ("127.0.0.1", "::1"):
+        raise web.HTTPForbidden(text="debug endpoints are only available from localhost")
+
+async def handle_loop_debug(request):
+    _check_debug_access(request)
+    return web.json_response(loop_watchdog.snapshot())
+
+async def handle_memory_debug(request):
+    _check_debug_access(request)
+    report = await request.app[BOT_KEY].memory_report()
+    # 伺服器名稱與 id 只在擁有者的 memory 指令中顯示
+    guilds = [{k: v for k, v in g.items() if k not in ('guild', 'name')} for g in report['guilds']]
+    return web.json_response({**report, 'guilds': guilds})
+
+
+# ----- 唯讀 JSON API（給社群網站 / CDN 使用）-----
+API_ORE_HOURS = 24       # 預設回傳未來幾個 Eorzea 小時
+API_ORE_MAX_HOURS = 96
+API_SOURCE_MAX_AGE = 60  # 魚餌來源可熱更新（game_data_watch_task 每 30 秒檢查），過期後以 ETag 重新驗證
+
+
+def ore_api_token(guild_id) -> str:
+    """/api/ores 的存取 token，由 API_SECRET 與伺服器 id 推導，不需另外儲存"""
+    return hmac.new(API_SECRET.encode(), str(guild_id).encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def _json_dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False, default=lambda o: o.isoformat() if isinstance(o, datetime) else str(o))
+
+
+def _digest(data) -> str:
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _api_response(request, etag: str, max_age: float, build: Callable[[], Any], private: bool = False):
+    """ETag 相符時直接回 304，不重新產生內容；max_age 對齊資料切換的時間點"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"{'private' if private else 'public'}, max-age={max(int(max_age), 0)}",
+    }
+    if etag in [t.strip() for t in request.headers.get("If-None-Match", "").split(",")]:
+        return web.Response(status=304, headers=headers)
+    return web.json_response(build(), headers=headers, dumps=_json_dumps)
+
+
+async def handle_api_voyage(request):
+    now = datetime.now(tz=TIMEZONE)
+    current = get_voyage(now)
+    # next_even_hour_full 於出航時間 30 分後切換到下一班
+    expires = current['departure'] + timedelta(minutes=30)
+    return _api_response(
+        request,
+        f'"voyage-{current["voyage"]}-{current["data_version"]}"',
+        (expires - now).total_seconds(),
+        lambda: {"current": current, "next": get_voyage_info(current['voyage'] + 1)},
+    )
+
+
+async def handle_api_sources(request):
+    # 遊戲資料內容有變動時版本號一定會換，ETag 用版本號即可，304 時不必產生內容
+    return _api_response(
+        request, f'"sources-{game_data.current().version}"', API_SOURCE_MAX_AGE, lambda: {"sources": get_sources()},
+    )
+
+
+async def handle_api_ores(request):
+    guild_id = request.query.get("guild")
+    if not guild_id:
+        raise web.HTTPBadRequest(text="guild is required")
+    # 監控清單屬於各伺服器，需帶該伺服器管理員以 ore_api_token 指令取得的 token
+    if not API_SECRET:
+        raise web.HTTPForbidden(text="ore API is disabled")
+    if not hmac.compare_digest(request.query.get("token", "").encode(), ore_api_token(guild_id).encode()):
+        raise web.HTTPUnauthorized(text="invalid token for this guild")
+    try:
+        hours = min(int(request.query.get("hours", API_ORE_HOURS)), API_ORE_MAX_HOURS)
+    except ValueError:
+        raise web.HTTPBadRequest(text="hours must be an integer")
+
+    now = datetime.now(tz=TIMEZONE)
+    start = eorzea_hour_start(now)
+    ores = ore_index.guilds.get(guild_id, {})
+
+    def build():
+        windows = []
+        for i in range(hours):
+            window_start = start + timedelta(seconds=i * EORZEA_HOUR_EARTH_SECONDS)
+            et = convert_to_eorzea_time(window_start)
+            found = ore_index.due(et.hour).get(guild_id)
+            if found:
+                windows.append({
+                    "et_hour": et.hour,
+                    "et_datehour": et.get_datehour(),
+                    "start": window_start,
+                    "ores": [{"name": name, "place": place} for name, place in found],
+                })
+        return {"windows": windows}
+
+    et_now = convert_to_eorzea_time(start)
+    expires = start + timedelta(seconds=EORZEA_HOUR_EARTH_SECONDS)
+    return _api_response(
+        request,
+        f'"ores-{guild_id}-{et_now.get_datehour()}-{hours}-{_digest(ores)}"',
+        (expires - now).total_seconds(),
+        build,
+        private=True,
+    )
+
+
+BOT_KEY = web.AppKey("bot", AnnounceBot)
+
+
+async def start_http_server(port: int, bot: AnnounceBot):
     app = web.Application()
-    app.add_routes([web.get("/", handle_ok), web.get("/health", handle_ok)])
+    app[BOT_KEY] = bot
+    app.add_routes([
+        web.get("/", handle_ok),
+        web.get("/health", handle_ok),
+        web.get("/debug/loop", handle_loop_debug),
+        web.get("/debug/memory", handle_memory_debug),
+        web.get("/api/voyage", handle_api_voyage),
+        web.get("/api/sources", handle_api_sources),
+        web.get("/api/ores", handle_api_ores),
+    ])
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, "0.0.0.0", port)
@@ -611,6 +1808,8 @@ async def main():
 
     bot = AnnounceBot(command_prefix="？")
 
+    loop_watchdog.start()
+
     await redis_wrapper.connect()
 
     # Unix: 把 SIGINT/SIGTERM 與 event 連結
@@ -622,7 +1821,7 @@ async def main():
             pass
 
     # 啟動 HTTP server（滿足 Render 的 port scan）
-    runner = await start_http_server(PORT)
+    runner = await start_http_server(PORT, bot)
 
     # 啟動 discord bot（在 background task）
     bot_task = asyncio.create_task(bot.start(TOKEN))
@@ -633,6 +1832,10 @@ async def main():
     await shutdown_event.wait()
     logger.info("Shutdown signal received — beginning graceful shutdown...")
 
+    # 先讓出 lease，standby 可以立即接手
+    if leader_lease is not None:
+        await leader_lease.release()
+
     # 先關閉 discord bot
     try:
         await bot.close()
@@ -648,6 +1851,14 @@ async def main():
     except Exception as e:
         logger.exception("Error cleaning up HTTP runner: %s", e)
 
+    if webhook_registry is not None:
+        await webhook_registry.close()
+
+    await loop_watchdog.stop()
+
+    if card_renderer is not None:
+        card_renderer.shutdown()
+
     # 等待 bot_task 結束（若尚未）
     try:
         await asyncio.wait_for(bot_task, timeout=10)
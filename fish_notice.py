@@ -1,162 +1,21 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import math
+from typing import Tuple
 from zoneinfo import ZoneInfo
 
-BAIT_CHT = {
-    'Glowworm': '火螢',
-    'Shrimp Cage': '小蝦肉籠',
-    'Heavy Steel Jig': '重鐵板鉤',
-    'Rat Tail': '溝鼠尾巴',
-    'Squid Strip': '烏賊絲',
-    'Pill Bug': '潮蟲',
-    'Ragworm': '石沙蠶',
-    'Krill': '磷蝦',
-    'Plump Worm': '海腸',
-    'Mackerel Strip': '青花魚塊',
-    'Stonefly Nymph': '石蠅幼蟲'
-}
+import game_data
+from game_data import TIME_LIST
 
-BAIT_SOURCE = {
-    'Glowworm': '海都市場─工具商',
-    'Shrimp Cage': '海都市場─工具商',
-    'Heavy Steel Jig': '金工40級製作',
-    'Rat Tail': '海都市場─工具商',
-    'Squid Strip': '海釣碼頭─工票交易員(需解5.0藍++)',
-    'Pill Bug': '海都市場─工具商',
-    'Mackerel Strip': '海釣碼頭─工票交易員(需解6.0藍++)',
-    'Stonefly Nymph': '3.0以上都市─工具商'
-}
+# 魚餌、航線 pattern、幻海資訊等遊戲資料放在 game_data.json，可不重啟直接更新（見 game_data.py）
 
-COLOR_CHT = {
-    'Red': '紅',
-    'Green': '綠'
+TIME_CHT = {
+    'D': '白天',
+    'S': '黃昏',
+    'N': '夜晚'
 }
 
-NEAR_PATTERN = [
-    'BD', 'TD', 'ND', 'RD', 'BS', 'TS', 'NS', 'RS', 'BN', 'TN', 'NN', 'RN',
-    'TD', 'ND', 'RD', 'BS', 'TS', 'NS', 'RS', 'BN', 'TN', 'NN', 'RN', 'BD',
-    'ND', 'RD', 'BS', 'TS', 'NS', 'RS', 'BN', 'TN', 'NN', 'RN', 'BD', 'TD',
-    'RD', 'BS', 'TS', 'NS', 'RS', 'BN', 'TN', 'NN', 'RN', 'BD', 'TD', 'ND',
-    'BS', 'TS', 'NS', 'RS', 'BN', 'TN', 'NN', 'RN', 'BD', 'TD', 'ND', 'RD',
-    'TS', 'NS', 'RS', 'BN', 'TN', 'NN', 'RN', 'BD', 'TD', 'ND', 'RD', 'BS',
-    'NS', 'RS', 'BN', 'TN', 'NN', 'RN', 'BD', 'TD', 'ND', 'RD', 'BS', 'TS',
-    'RS', 'BN', 'TN', 'NN', 'RN', 'BD', 'TD', 'ND', 'RD', 'BS', 'TS', 'NS',
-    'BN', 'TN', 'NN', 'RN', 'BD', 'TD', 'ND', 'RD', 'BS', 'TS', 'NS', 'RS',
-    'TN', 'NN', 'RN', 'BD', 'TD', 'ND', 'RD', 'BS', 'TS', 'NS', 'RS', 'BN',
-    'NN', 'RN', 'BD', 'TD', 'ND', 'RD', 'BS', 'TS', 'NS', 'RS', 'BN', 'TN',
-    'RN', 'BD', 'TD', 'ND', 'RD', 'BS', 'TS', 'NS', 'RS', 'BN', 'TN', 'NN'
-]
-
-FAR_PATTERN = [
-    'AD', 'SD', 'AS', 'SS', 'AN', 'SN', 'AD', 'SD', 'AS', 'SS', 'AN', 'SN',
-    'SD', 'AS', 'SS', 'AN', 'SN', 'AD', 'SD', 'AS', 'SS', 'AN', 'SN', 'AD',
-    'AS', 'SS', 'AN', 'SN', 'AD', 'SD', 'AS', 'SS', 'AN', 'SN', 'AD', 'SD',
-    'SS', 'AN', 'SN', 'AD', 'SD', 'AS', 'SS', 'AN', 'SN', 'AD', 'SD', 'AS',
-    'AN', 'SN', 'AD', 'SD', 'AS', 'SS', 'AN', 'SN', 'AD', 'SD', 'AS', 'SS',
-    'SN', 'AD', 'SD', 'AS', 'SS', 'AN', 'SN', 'AD', 'SD', 'AS', 'SS', 'AN'
-]
-
-AREA = ['OGB', 'SSM', 'NSM', 'ORS', 'CM', 'OBS', 'OTS', 'OSS', 'KC', 'OR', 'LOR']
-
-TIME_LIST = ['D', 'S', 'N']
-
-SPEC_BAIT = {
-    'OGB': 'Plump Worm',
-    'SSM': 'Krill',
-    'NSM': 'Ragworm',
-    'ORS': 'Plump Worm',
-    'CM': 'Ragworm',
-    'OBS': 'Krill',
-    'OTS': 'Plump Worm',
-    'OSS': 'Plump Worm',
-    'KC': 'Ragworm',
-    'OR': 'Krill',
-    'LOR': 'Plump Worm'
-}  # 普通海域幻光魚餌
-
-SPEC_COLOR = {
-    'OGB': 'Red',
-    'SSM': 'Green',
-    'NSM': 'Green',
-    'ORS': 'Red',
-    'CM': 'Green',
-    'OBS': 'Red',
-    'OTS': 'Red',
-    'OSS': 'Red',
-    'KC': 'Red',
-    'OR': 'Red',
-    'LOR': 'Red'
-}  # 普通海域幻光拉餌顏色
-
-AREA_MAPPING = {
-    'B': ['CM', 'NSM', 'OBS'],
-    'T': ['CM', 'ORS', 'OTS'],
-    'N': ['SSM', 'OGB', 'NSM'],
-    'R': ['OGB', 'SSM', 'ORS'],
-    'S': ['OSS', 'KC', 'OR'],
-    'A': ['OSS', 'KC', 'LOR']
-}
-
-OROLA_BAIT = {
-    'OGB': {
-        'D': {'BAIT': 'Ragworm', 'KING': False, 'MOOCH': False},
-        'S': {'BAIT': 'Plump Worm', 'KING': False, 'MOOCH': False},
-        'N': {'BAIT': 'Glowworm', 'KING': True, 'MOOCH': False, 'COLOR': 'Red'}
-    },
-    'SSM': {
-        'D': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-        'S': {'BAIT': 'Ragworm', 'KING': False, 'MOOCH': True},
-        'N': {'BAIT': 'Shrimp Cage', 'KING': True, 'MOOCH': True, 'COLOR': 'Red'}
-    },
-    'NSM': {
-        'D': {'BAIT': 'Heavy Steel Jig', 'KING': True, 'MOOCH': False, 'COLOR': 'Red'},
-        'S': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-        'N': {'BAIT': 'Ragworm', 'KING': False, 'MOOCH': False}
-    },
-    'ORS': {
-        'D': {'BAIT': 'Plump Worm', 'KING': False, 'MOOCH': False},
-        'S': {'BAIT': 'Rat Tail', 'KING': True, 'MOOCH': False, 'COLOR': 'Red'},
-        'N': {'BAIT': 'Ragworm', 'KING': False, 'MOOCH': False}
-    },
-    'CM': {
-        'D': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-        'S': {'BAIT': 'Plump Worm', 'KING': False, 'MOOCH': False},
-        'N': {'BAIT': 'Squid Strip', 'KING': True, 'MOOCH': False, 'COLOR': 'Red'}
-    },
-    'OBS': {
-        'D': {'BAIT': 'Ragworm', 'KING': True, 'MOOCH': False, 'KING_BAIT': 'Pill Bug', 'COLOR': 'Green'},
-        'S': {'BAIT': 'Plump Worm', 'KING': False, 'MOOCH': False},
-        'N': {'BAIT': 'Plump Worm', 'KING': False, 'MOOCH': False}
-    },
-    'OTS': {
-        'D': {'BAIT': 'Krill', 'KING': False, 'MOOCH': True},
-        'S': {'BAIT': 'Krill', 'KING': True, 'MOOCH': True, 'COLOR': 'Red'},
-        'N': {'BAIT': 'Krill', 'KING': False, 'MOOCH': True}
-    },
-    'OSS': {
-        'D': {'BAIT': 'Krill', 'KING': True, 'MOOCH': False, 'KING_BAIT': 'Mackerel Strip', 'COLOR': 'Green'},
-        'S': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-        'N': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-    }, 
-    'KC': {
-        'D': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-        'S': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-        'N': {'BAIT': 'Plump Worm', 'KING': True, 'MOOCH': True, 'COLOR': 'Red'},
-    }, 
-    'OR': {
-        'D': {'BAIT': 'Ragworm', 'KING': False, 'MOOCH': False},
-        'S': {'BAIT': 'Plump Worm', 'KING': True, 'MOOCH': False, 'KING_BAIT': 'Squid Strip', 'COLOR': 'Red'},
-        'N': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-    }, 
-    'LOR': {
-        'D': {'BAIT': 'Stonefly Nymph', 'KING': True, 'MOOCH': False, 'COLOR': 'Red'},
-        'S': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-        'N': {'BAIT': 'Krill', 'KING': False, 'MOOCH': False},
-    }
-}   # 幻海注意事項
-
 TWO_HOURS = 2 * 60 * 60
-OFFSET = 132
 
 
 def next_even_hour_full(now=None, threshold_minute=30, include_equal=True):
@@ -180,62 +39,162 @@ def next_even_hour_full(now=None, threshold_minute=30, include_equal=True):
     return base + timedelta(hours=delta_hours)
 
 
+FIRST_DATE = datetime(1970, 1, 1, tzinfo=ZoneInfo("Asia/Taipei"))
+
+
+def get_voyage_number(targetDate: datetime) -> int:
+    """回傳 targetDate 所屬的航班編號（每 2 小時一班）"""
+    return math.floor((targetDate - FIRST_DATE).total_seconds() / TWO_HOURS)
+
+
+def get_voyage_time(voyageNumber: int) -> datetime:
+    """回傳航班編號對應的出航時間（Asia/Taipei）"""
+    return FIRST_DATE + timedelta(seconds=voyageNumber * TWO_HOURS)
+
+
 def get_route(targetDate: datetime):
-    first_date = datetime(1970, 1, 1, tzinfo=ZoneInfo("Asia/Taipei"))
-    voyageNumber = math.floor((targetDate - first_date).total_seconds() / TWO_HOURS)
-    nesr_index = (OFFSET + voyageNumber) % len(NEAR_PATTERN)
-    far_index = (OFFSET + voyageNumber) % len(FAR_PATTERN)
+    return get_voyage_route(get_voyage_number(targetDate))
+
 
-    near_route = NEAR_PATTERN[nesr_index]
-    far_route = FAR_PATTERN[far_index]
+def get_voyage_route(voyageNumber: int, data: game_data.GameData = None):
+    data = data or game_data.current()
+    nesr_index = (data.offset + voyageNumber) % len(data.near_pattern)
+    far_index = (data.offset + voyageNumber) % len(data.far_pattern)
+
+    near_route = data.near_pattern[nesr_index]
+    far_route = data.far_pattern[far_index]
 
     return near_route, far_route
 
 
-def get_bait(rawDate: datetime=datetime.now(tz=ZoneInfo("Asia/Taipei"))):
+def get_route_stops(route_time: str, data: game_data.GameData = None):
+    """將航線代碼（如 'BD'）展開成三個釣場的 (海域, 時段)"""
+    data = data or game_data.current()
+    route = route_time[0]
+    time_index = TIME_LIST.index(route_time[1])
+    return [(data.area_mapping[route][i], TIME_LIST[(time_index + i) % 3]) for i in range(3)]
+
+
+def get_stop(area: str, time: str) -> dict:
+    """單一釣場（海域 + 時段）的魚餌資訊（載入時預先編譯，請勿修改回傳值）"""
+    return game_data.current().stops[(area, time)]
+
+
+def get_voyage_info(voyageNumber: int) -> dict:
+    """航班的結構化資料（get_bait 的文字即由此產生）"""
+    data = game_data.current()
+    near_route_time, far_route_time = get_voyage_route(voyageNumber, data)
+    return {
+        'voyage': voyageNumber,
+        'departure': get_voyage_time(voyageNumber),
+        'data_version': data.version,
+        'routes': [
+            {
+                'type': route_type,
+                'route': route_time,
+                'stops': [data.stops[stop] for stop in get_route_stops(route_time, data)],
+            }
+            for route_type, route_time in (('near', near_route_time), ('far', far_route_time))
+        ],
+    }
+
+
+def get_voyage(rawDate: datetime) -> dict:
+    """目前時段/下個時段的航班（與 get_bait 相同的判斷方式）"""
     targetDate = next_even_hour_full(rawDate)
-    near_route_time, far_route_time = get_route(targetDate)
+    info = get_voyage_info(get_voyage_number(targetDate))
+    info['departure'] = targetDate
+    return info
+
 
+def render_bait(voyage: dict) -> str:
+    color_cht = game_data.current().color_cht
     messages = []
-    messages.append(f'航線時間: {targetDate.strftime("%Y/%m/%d %H:%M")}')
+    messages.append(f'航線時間: {voyage["departure"].strftime("%Y/%m/%d %H:%M")}')
 
-    for fish_route_time in (near_route_time, far_route_time):
+    for route in voyage['routes']:
         messages.append('=' * 28)
-        if fish_route_time == near_route_time:
+        if route['type'] == 'near':
             messages.append('> **（近海航線）**')
         else:
             messages.append('> **（遠洋航線）**')
-        route = fish_route_time[0]
-        time = fish_route_time[1]
-        time_index = TIME_LIST.index(time)
 
-        for i in range(3):
+        for i, stop in enumerate(route['stops']):
+            orola = stop['orola']
             messages.append('> ' + '=' * 20)
-            area = AREA_MAPPING[route][i]
-            spec_bait = SPEC_BAIT[area]
-            orola = OROLA_BAIT[area][TIME_LIST[(time_index + i) % 3]]
-
-            messages.append(f'> 釣場 No.{i + 1}, 釣餌: [ {BAIT_CHT[spec_bait]} ], !!!{COLOR_CHT[SPEC_COLOR[area]]}色')
-            messages.append(f'> 幻海釣餌: [ {BAIT_CHT[orola['BAIT']]} ]' + (', 以小釣大' if orola['MOOCH'] else ''))
-            if orola['KING']:
-                messages.append(f'>     !!!幻海海王!!!' + (f', 釣餌: [ {BAIT_CHT[orola["KING_BAIT"]]} ]' if "KING_BAIT" in orola else '') + f', !!!{COLOR_CHT[orola["COLOR"]]}色')
-                if orola['BAIT'] in BAIT_SOURCE:
-                    messages.append(f'>        魚餌取得方式: {BAIT_SOURCE[orola["BAIT"]]}')
-                if "KING_BAIT" in orola and orola['KING_BAIT'] in BAIT_SOURCE:
-                    messages.append(f'>        魚餌取得方式: {BAIT_SOURCE[orola["KING_BAIT"]]}')
+            messages.append(f'> 釣場 No.{i + 1}, 釣餌: [ {stop["bait_cht"]} ], !!!{color_cht[stop["color"]]}色')
+            messages.append(f'> 幻海釣餌: [ {orola["bait_cht"]} ]' + (', 以小釣大' if orola['mooch'] else ''))
+            if orola['king']:
+                messages.append(f'>     !!!幻海海王!!!' + (f', 釣餌: [ {orola["king_bait_cht"]} ]' if orola['king_bait'] else '') + f', !!!{color_cht[orola["color"]]}色')
+                for source in orola['sources']:
+                    messages.append(f'>        魚餌取得方式: {source}')
 
     messages.append('=' * 28)
-    
+
     return "\n".join(messages)
 
 
+# 已產生的公告文字: (航班編號, 出航時間) -> 文字；遊戲資料更新時只清掉內容有變的航班
+_BAIT_CACHE_SIZE = 16
+_bait_cache: "OrderedDict[Tuple[int, str], str]" = OrderedDict()
+
+
+def get_bait(rawDate: datetime=datetime.now(tz=ZoneInfo("Asia/Taipei"))):
+    targetDate = next_even_hour_full(rawDate)
+    key = (get_voyage_number(targetDate), targetDate.isoformat())
+    if key in _bait_cache:
+        _bait_cache.move_to_end(key)
+        return _bait_cache[key]
+
+    message = render_bait(get_voyage(rawDate))
+    _bait_cache[key] = message
+    if len(_bait_cache) > _BAIT_CACHE_SIZE:
+        _bait_cache.popitem(last=False)
+    return message
+
+
+def _voyage_stops(voyageNumber: int, data: game_data.GameData):
+    return [
+        stop for route_time in get_voyage_route(voyageNumber, data) for stop in get_route_stops(route_time, data)
+    ]
+
+
+def _invalidate_bait_cache(old: game_data.GameData, new: game_data.GameData, diff: game_data.GameDataDiff):
+    for key in list(_bait_cache):
+        voyageNumber = key[0]
+        old_stops = _voyage_stops(voyageNumber, old)
+        new_stops = _voyage_stops(voyageNumber, new)
+        if old_stops != new_stops or diff.changed_stops.intersection(new_stops):
+            del _bait_cache[key]
+
+
+game_data.add_listener(_invalidate_bait_cache)
+
+
+def get_kings(voyage: dict) -> list:
+    """航班中會出現幻海海王的 (海域, 時段)"""
+    return [
+        (stop['area'], stop['time'])
+        for route in voyage['routes'] for stop in route['stops'] if stop['orola']['king']
+    ]
+
+
+def get_sources() -> list:
+    data = game_data.current()
+    return [
+        {'bait': name, 'bait_cht': data.bait_cht[name], 'source': source}
+        for name, source in data.bait_source.items()
+    ]
+
+
 def get_source():
     messages = ["幻海海王魚餌取得方式:"]
-    for name, source in BAIT_SOURCE.items():
-        cht_name = BAIT_CHT[name]
-        messages.append(cht_name + '　' * (4 - len(cht_name)) + f': {source}')
+    for item in get_sources():
+        cht_name = item['bait_cht']
+        messages.append(cht_name + '　' * (4 - len(cht_name)) + f': {item["source"]}')
     return "\n".join(messages)
 
 
-current_time = datetime.now(tz=ZoneInfo("Asia/Taipei"))
-print(get_bait(current_time + timedelta(hours=6)))
+if __name__ == "__main__":
+    current_time = datetime.now(tz=ZoneInfo("Asia/Taipei"))
+    print(get_bait(current_time + timedelta(hours=6)))
@@ -0,0 +1,267 @@
+"""
+海釣遊戲資料（魚餌、航線 pattern、幻海資訊）的載入、驗證與熱更新。
+
+資料放在 game_data.json（或環境變數 GAME_DATA_FILE 指定的檔案），
+載入時先驗證並編譯成 GameData，成功後才一次換掉目前使用的版本；
+驗證失敗時保留舊資料。換版後會通知 listener 哪些釣場 / 航線真的有變動，
+讓各自的快取只清掉受影響的部分。
+"""
+from dataclasses import dataclass, field
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+logger = logging.getLogger("dc_bot")
+
+TIME_LIST = ['D', 'S', 'N']
+
+GAME_DATA_FILE = Path(os.getenv("GAME_DATA_FILE", Path(__file__).with_name("game_data.json")))
+
+TABLES = (
+    'bait_cht', 'bait_source', 'color_cht', 'area_mapping', 'spec_bait', 'spec_color', 'orola_bait',
+    'near_pattern', 'far_pattern', 'offset',
+)
+
+
+class GameDataError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class GameData:
+    version: int
+    offset: int
+    bait_cht: Dict[str, str]
+    bait_source: Dict[str, str]
+    color_cht: Dict[str, str]
+    area_mapping: Dict[str, List[str]]
+    spec_bait: Dict[str, str]
+    spec_color: Dict[str, str]
+    orola_bait: Dict[str, Dict[str, dict]]
+    near_pattern: Tuple[str, ...]
+    far_pattern: Tuple[str, ...]
+    # 以下為載入時預先編譯的結果
+    stops: Dict[Tuple[str, str], dict] = field(default_factory=dict)
+    kings: Tuple[Tuple[str, str], ...] = ()
+
+
+@dataclass(frozen=True)
+class GameDataDiff:
+    old_version: Optional[int]
+    new_version: int
+    changed_stops: FrozenSet[Tuple[str, str]]
+    routes_changed: bool
+    sources_changed: bool
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.changed_stops) or self.routes_changed or self.sources_changed
+
+
+def _require(cond, message):
+    if not cond:
+        raise GameDataError(message)
+
+
+def _is_int(value) -> bool:
+    # bool 是 int 的子類別，true/false 不能當成數字
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _require_str_map(raw: dict, name: str):
+    table = raw[name]
+    _require(isinstance(table, dict), f"'{name}' must be an object")
+    for key, value in table.items():
+        _require(isinstance(value, str), f"{name}[{key}]: must be a string")
+
+
+def _validate(raw: dict):
+    _require(isinstance(raw, dict), "game data must be a JSON object")
+    for name in ('version',) + TABLES:
+        _require(name in raw, f"missing '{name}'")
+    _require(_is_int(raw['version']), "'version' must be an integer")
+    _require(_is_int(raw['offset']), "'offset' must be an integer")
+    for name in ('bait_cht', 'bait_source', 'color_cht', 'spec_bait', 'spec_color'):
+        _require_str_map(raw, name)
+    for name in ('area_mapping', 'orola_bait'):
+        _require(isinstance(raw[name], dict), f"'{name}' must be an object")
+
+    bait_cht = raw['bait_cht']
+    for bait in raw['bait_source']:
+        _require(bait in bait_cht, f"bait_source: unknown bait '{bait}'")
+
+    for route, stops in raw['area_mapping'].items():
+        _require(len(route) == 1, f"area_mapping: route id '{route}' must be one character")
+        _require(
+            isinstance(stops, list) and len(stops) == 3 and all(isinstance(area, str) for area in stops),
+            f"area_mapping: route '{route}' must be a list of 3 areas",
+        )
+    areas = {area for stops in raw['area_mapping'].values() for area in stops}
+
+    for area in areas:
+        _require(raw['spec_bait'].get(area) in bait_cht, f"spec_bait: missing or unknown bait for '{area}'")
+        _require(raw['spec_color'].get(area) in raw['color_cht'], f"spec_color: missing or unknown color for '{area}'")
+        _require(isinstance(raw['orola_bait'].get(area), dict), f"orola_bait[{area}]: missing or not an object")
+        for t in TIME_LIST:
+            orola = raw['orola_bait'][area].get(t)
+            where = f"orola_bait[{area}][{t}]"
+            _require(isinstance(orola, dict), f"{where}: missing or not an object")
+            _require(isinstance(orola.get('BAIT'), str) and orola['BAIT'] in bait_cht, f"{where}: missing or unknown BAIT")
+            _require(isinstance(orola.get('KING'), bool), f"{where}: KING must be true/false")
+            _require(isinstance(orola.get('MOOCH'), bool), f"{where}: MOOCH must be true/false")
+            if orola['KING']:
+                _require(isinstance(orola.get('COLOR'), str) and orola['COLOR'] in raw['color_cht'],
+                         f"{where}: king needs a known COLOR")
+            if 'KING_BAIT' in orola:
+                _require(isinstance(orola['KING_BAIT'], str) and orola['KING_BAIT'] in bait_cht,
+                         f"{where}: unknown KING_BAIT")
+
+    for name in ('near_pattern', 'far_pattern'):
+        _require(isinstance(raw[name], list) and len(raw[name]) > 0, f"{name} must be a non-empty list")
+        for route_time in raw[name]:
+            _require(
+                isinstance(route_time, str) and len(route_time) == 2
+                and route_time[0] in raw['area_mapping'] and route_time[1] in TIME_LIST,
+                f"{name}: invalid route '{route_time}'",
+            )
+
+
+def _compile_stop(raw: dict, area: str, time: str) -> dict:
+    spec_bait = raw['spec_bait'][area]
+    orola = raw['orola_bait'][area][time]
+    bait_cht = raw['bait_cht']
+    stop = {
+        'area': area,
+        'time': time,
+        'bait': spec_bait,
+        'bait_cht': bait_cht[spec_bait],
+        'color': raw['spec_color'][area],
+        'orola': {
+            'bait': orola['BAIT'],
+            'bait_cht': bait_cht[orola['BAIT']],
+            'mooch': orola['MOOCH'],
+            'king': orola['KING'],
+        },
+    }
+    if orola['KING']:
+        stop['orola']['color'] = orola['COLOR']
+        stop['orola']['king_bait'] = orola.get('KING_BAIT')
+        stop['orola']['king_bait_cht'] = bait_cht[orola['KING_BAIT']] if 'KING_BAIT' in orola else None
+        stop['orola']['sources'] = [
+            raw['bait_source'][bait] for bait in (orola['BAIT'], orola.get('KING_BAIT')) if bait in raw['bait_source']
+        ]
+    return stop
+
+
+def compile_game_data(raw: dict) -> GameData:
+    try:
+        _validate(raw)
+    except GameDataError:
+        raise
+    except (TypeError, AttributeError, KeyError, ValueError) as e:
+        # 上面沒檢查到的型別錯誤也一律視為資料錯誤，不讓呼叫端收到其他例外
+        raise GameDataError(f"invalid game data: {e!r}") from e
+    areas = sorted({area for stops in raw['area_mapping'].values() for area in stops})
+    stops = {(area, t): _compile_stop(raw, area, t) for area in areas for t in TIME_LIST}
+    return GameData(
+        version=raw['version'],
+        offset=raw['offset'],
+        bait_cht=dict(raw['bait_cht']),
+        bait_source=dict(raw['bait_source']),
+        color_cht=dict(raw['color_cht']),
+        area_mapping={route: list(a) for route, a in raw['area_mapping'].items()},
+        spec_bait=dict(raw['spec_bait']),
+        spec_color=dict(raw['spec_color']),
+        orola_bait=raw['orola_bait'],
+        near_pattern=tuple(raw['near_pattern']),
+        far_pattern=tuple(raw['far_pattern']),
+        stops=stops,
+        kings=tuple(key for key, stop in stops.items() if stop['orola']['king']),
+    )
+
+
+def load_game_data(path=None) -> GameData:
+    path = Path(path or GAME_DATA_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise GameDataError(f"cannot read {path}: {e}") from e
+    return compile_game_data(raw)
+
+
+def diff_game_data(old: Optional[GameData], new: GameData) -> GameDataDiff:
+    if old is None:
+        return GameDataDiff(None, new.version, frozenset(new.stops), True, True)
+    return GameDataDiff(
+        old_version=old.version,
+        new_version=new.version,
+        changed_stops=frozenset(
+            key for key in old.stops.keys() | new.stops.keys()
+            # 顏色名稱變動時每個釣場的公告文字都會不同
+            if old.stops.get(key) != new.stops.get(key) or old.color_cht != new.color_cht
+        ),
+        routes_changed=(
+            old.offset != new.offset or old.near_pattern != new.near_pattern
+            or old.far_pattern != new.far_pattern or old.area_mapping != new.area_mapping
+        ),
+        sources_changed=old.bait_source != new.bait_source or old.bait_cht != new.bait_cht,
+    )
+
+
+_current: GameData = load_game_data()
+_mtime: Optional[float] = GAME_DATA_FILE.stat().st_mtime if GAME_DATA_FILE.exists() else None
+_listeners: List[Callable[[GameData, GameData, GameDataDiff], None]] = []
+
+
+def current() -> GameData:
+    return _current
+
+
+def add_listener(callback: Callable[[GameData, GameData, GameDataDiff], None]):
+    """callback(old, new, diff) 會在每次換版後呼叫"""
+    _listeners.append(callback)
+
+
+def reload_game_data(path=None) -> GameDataDiff:
+    """重新載入資料檔；驗證失敗時丟出 GameDataError 並保留目前版本"""
+    global _current, _mtime
+    path = Path(path or GAME_DATA_FILE)
+    mtime = path.stat().st_mtime
+    new = load_game_data(path)
+    old = _current
+    diff = diff_game_data(old, new)
+    if diff.changed and new.version == old.version:
+        raise GameDataError(f"{path} changed but version is still {new.version}")
+
+    _current = new
+    _mtime = mtime
+    # 只改版本號也算換版：依版本判斷新舊的 listener（例如航班日曆檔）也要收到通知
+    if new.version != old.version:
+        logger.info(
+            "Game data %s -> %s: %d stops changed, routes changed=%s, sources changed=%s",
+            old.version, new.version, len(diff.changed_stops), diff.routes_changed, diff.sources_changed,
+        )
+        for callback in _listeners:
+            try:
+                callback(old, new, diff)
+            except Exception:
+                logger.exception("Game data listener %r failed", callback)
+    return diff
+
+
+def reload_if_changed(path=None) -> Optional[GameDataDiff]:
+    """給檔案監看用：只有 mtime 變動時才重新載入"""
+    global _mtime
+    path = Path(path or GAME_DATA_FILE)
+    mtime = path.stat().st_mtime
+    if mtime == _mtime:
+        return None
+    try:
+        return reload_game_data(path)
+    except Exception:
+        # 任何載入失敗都只回報一次，等下次修改再重試
+        _mtime = mtime
+        raise
@@ -0,0 +1,145 @@
+"""
+以 Redis sorted set 實作的延遲工作佇列。
+
+- pending: score 為觸發時間（epoch 秒）的 sorted set，member 為 job id
+- processing: 已被領取、尚未完成的 job，score 為逾時時間；worker 掛掉時會被放回 pending
+- data: job id -> payload(JSON) 的 hash
+- done:<job id>: 已完成的標記（有 TTL），避免排程器重複排入已送出的 job
+
+job id 由排程內容決定（例如 fish:<航班>:<頻道>:<提前分鐘>），重複排程不會產生第二筆；
+領取以 Lua script 原子完成，多個 worker 同時執行也只會有一個拿到同一筆 job。
+"""
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger("dc_bot")
+
+_SCHEDULE = """
+if redis.call('EXISTS', KEYS[4] .. ARGV[1]) == 1 or redis.call('ZSCORE', KEYS[2], ARGV[1]) then
+    return 0
+end
+local added = redis.call('ZADD', KEYS[1], 'NX', ARGV[2], ARGV[1])
+if added == 1 then
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[3])
+end
+return added
+"""
+
+# ARGV: job id, 觸發時間, payload 三個一組
+_SCHEDULE_MANY = """
+local added = 0
+for i = 1, #ARGV, 3 do
+    local id = ARGV[i]
+    if redis.call('EXISTS', KEYS[4] .. id) == 0 and not redis.call('ZSCORE', KEYS[2], id) then
+        if redis.call('ZADD', KEYS[1], 'NX', ARGV[i + 1], id) == 1 then
+            redis.call('HSET', KEYS[3], id, ARGV[i + 2])
+            added = added + 1
+        end
+    end
+end
+return added
+"""
+
+_CLAIM = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local result = {}
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('ZADD', KEYS[2], ARGV[1] + ARGV[3], id)
+    table.insert(result, id)
+    table.insert(result, redis.call('HGET', KEYS[3], id) or '{}')
+end
+return result
+"""
+
+_ACK = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('SET', KEYS[3] .. ARGV[1], '1', 'EX', ARGV[2])
+return 1
+"""
+
+_EXTEND = """
+local extended = 0
+for i = 2, #ARGV do
+    extended = extended + redis.call('ZADD', KEYS[1], 'XX', 'CH', ARGV[1], ARGV[i])
+end
+return extended
+"""
+
+_REQUEUE = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('ZADD', KEYS[1], ARGV[1], id)
+end
+return #ids
+"""
+
+
+def _loads(raw: str) -> Dict[str, Any]:
+    """payload 損毀時回傳空 dict，由呼叫端當成格式錯誤的 job 丟棄"""
+    try:
+        payload = json.loads(raw)
+    except ValueError:
+        return {}
+    return payload if isinstance(payload, dict) else {}
+
+
+class JobQueue:
+    def __init__(self, redis, prefix: str = "jobs", visibility_timeout: int = 60, done_ttl: int = 24 * 60 * 60):
+        """redis 需提供 eval（例如 RedisWrapper）"""
+        self.redis = redis
+        self.pending_key = f"{prefix}:pending"
+        self.processing_key = f"{prefix}:processing"
+        self.data_key = f"{prefix}:data"
+        self.done_prefix = f"{prefix}:done:"
+        self.visibility_timeout = visibility_timeout
+        self.done_ttl = done_ttl
+
+    async def schedule(self, job_id: str, fire_at: float, payload: Dict[str, Any]) -> bool:
+        """排入一筆 job；已存在、處理中或已完成時回傳 False"""
+        added = await self.redis.eval(
+            _SCHEDULE, 4, self.pending_key, self.processing_key, self.data_key, self.done_prefix,
+            job_id, fire_at, json.dumps(payload, ensure_ascii=False),
+        )
+        return bool(added)
+
+    async def schedule_many(self, jobs: Iterable[Tuple[str, float, Dict[str, Any]]], batch: int = 500) -> int:
+        """與 schedule 相同，但每 batch 筆只需一次 round trip；回傳新排入的筆數"""
+        jobs = list(jobs)
+        added = 0
+        for i in range(0, len(jobs), batch):
+            args = []
+            for job_id, fire_at, payload in jobs[i:i + batch]:
+                args.extend((job_id, fire_at, json.dumps(payload, ensure_ascii=False)))
+            added += await self.redis.eval(
+                _SCHEDULE_MANY, 4, self.pending_key, self.processing_key, self.data_key, self.done_prefix, *args,
+            )
+        return added
+
+    async def claim(self, now: float, limit: int = 50) -> List[Tuple[str, Dict[str, Any]]]:
+        """原子地領取 now 以前到期的 job；完成後務必呼叫 ack"""
+        raw = await self.redis.eval(
+            _CLAIM, 3, self.pending_key, self.processing_key, self.data_key,
+            now, limit, self.visibility_timeout,
+        )
+        return [(raw[i], _loads(raw[i + 1])) for i in range(0, len(raw), 2)]
+
+    async def extend(self, job_ids: Iterable[str], now: float) -> int:
+        """延長仍在處理中的 job 的逾時時間，處理較久時不會被 requeue_expired 重新發出"""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return 0
+        return await self.redis.eval(_EXTEND, 1, self.processing_key, now + self.visibility_timeout, *job_ids)
+
+    async def ack(self, job_id: str):
+        await self.redis.eval(_ACK, 3, self.processing_key, self.data_key, self.done_prefix, job_id, self.done_ttl)
+
+    async def requeue_expired(self, now: float) -> int:
+        """把逾時未 ack（worker 可能已掛掉）的 job 放回 pending"""
+        count = await self.redis.eval(_REQUEUE, 2, self.pending_key, self.processing_key, now)
+        if count:
+            logger.warning("Requeued %d expired jobs", count)
+        return count
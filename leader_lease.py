@@ -0,0 +1,109 @@
+"""
+以 Redis lease 決定哪一個 instance 負責送出公告（leader），其餘為 hot standby。
+
+- leader 每隔幾秒續約；沒續約成功超過 ttl，lease 自動過期，standby 就能接手
+- 每次取得 lease 都會遞增 fencing token，lease 的值為 <instance>:<token>；
+  送出前以 validate() 確認 Redis 上的值仍是自己，舊 leader 恢復後不會跟新 leader 重複送出
+- 本地也記錄 lease 到期時間，連不到 Redis 時會自行停止送出
+"""
+import logging
+import os
+import socket
+import time as st
+from typing import Optional
+
+logger = logging.getLogger("dc_bot")
+
+_ACQUIRE = """
+if redis.call('SET', KEYS[1], 'pending', 'NX', 'PX', ARGV[2]) then
+    local fence = redis.call('INCR', KEYS[2])
+    redis.call('SET', KEYS[1], ARGV[1] .. ':' .. fence, 'PX', ARGV[2])
+    return fence
+end
+return 0
+"""
+
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    def __init__(self, redis, key: str = "bot:leader", ttl: float = 15.0, instance_id: Optional[str] = None):
+        """redis 需提供 eval 與 get（例如 RedisWrapper）"""
+        self.redis = redis
+        self.key = key
+        self.fence_key = f"{key}:fence"
+        self.ttl = ttl
+        self.instance_id = instance_id or f"{socket.gethostname()}-{os.getpid()}"
+
+        self.fence: Optional[int] = None
+        self._expires_at = 0.0
+
+    @property
+    def value(self) -> Optional[str]:
+        return f"{self.instance_id}:{self.fence}" if self.fence is not None else None
+
+    @property
+    def is_leader(self) -> bool:
+        """只看本地紀錄：lease 在本地時鐘上尚未過期"""
+        return self.fence is not None and st.monotonic() < self._expires_at
+
+    async def acquire_or_renew(self) -> bool:
+        """leader 續約、standby 嘗試取得 lease；回傳目前是否為 leader"""
+        ttl_ms = int(self.ttl * 1000)
+        started = st.monotonic()
+        try:
+            if self.fence is not None:
+                if await self.redis.eval(_RENEW, 1, self.key, self.value, ttl_ms):
+                    self._expires_at = started + self.ttl
+                    return True
+                logger.warning("[Lease] lost leadership (fence %s)", self.fence)
+                self.fence = None
+
+            fence = await self.redis.eval(_ACQUIRE, 2, self.key, self.fence_key, self.instance_id, ttl_ms)
+            if fence:
+                self.fence = int(fence)
+                self._expires_at = started + self.ttl
+                logger.info("[Lease] %s became leader (fence %s)", self.instance_id, self.fence)
+                return True
+        except Exception:
+            logger.exception("[Lease] failed to acquire or renew")
+            if not self.is_leader:
+                self.fence = None
+        return self.is_leader
+
+    async def validate(self) -> bool:
+        """送出前確認 Redis 上的 lease 仍屬於自己（fencing）"""
+        if not self.is_leader:
+            return False
+        try:
+            current = await self.redis.get(self.key)
+        except Exception:
+            logger.exception("[Lease] failed to validate")
+            return self.is_leader
+        if current != self.value:
+            logger.warning("[Lease] fenced off: lease is held by %s", current)
+            self.fence = None
+            return False
+        return True
+
+    async def release(self):
+        if self.fence is None:
+            return
+        try:
+            await self.redis.eval(_RELEASE, 1, self.key, self.value)
+            logger.info("[Lease] released leadership (fence %s)", self.fence)
+        except Exception:
+            logger.exception("[Lease] failed to release")
+        self.fence = None
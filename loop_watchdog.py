@@ -0,0 +1,154 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+import logging
+import sys
+import threading
+import time as st
+import traceback
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger("dc_bot")
+
+
+class LoopWatchdog:
+    """
+    持續量測 event loop 延遲（lag）。
+
+    - loop 內的 heartbeat coroutine 每 interval 秒醒來一次，記錄實際多睡了多久。
+    - 另一條 daemon thread 監看 heartbeat；若超過 threshold 秒沒有更新（loop 被卡住），
+      就以 sys._current_frames() 把 loop thread 與其他 thread 的 stack 存進 ring buffer。
+      （不在監看 thread 走訪 asyncio task：asyncio.all_tasks 不是 thread-safe）
+    - _current_stall 與 stalls 由兩條 thread 共用，存取時都要持有 _lock。
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.25,
+        threshold: float = 1.0,
+        capacity: int = 20,
+        stack_limit: int = 20,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_limit = stack_limit
+
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=capacity)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.samples = 0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = st.monotonic()
+        self._current_stall: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """在 event loop 內呼叫：啟動 heartbeat task 與監看 thread。"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = st.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info("Loop watchdog started (interval=%ss, threshold=%ss)", self.interval, self.threshold)
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = st.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = st.monotonic()
+            lag = max(0.0, now - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.samples += 1
+
+            with self._lock:
+                self._last_beat = now
+                stall = self._current_stall
+                if stall is not None:
+                    # loop 已恢復，補上這次卡住的總時間
+                    stall["lag"] = round(lag, 3)
+                    self._current_stall = None
+                elif lag > self.threshold:
+                    # 卡住時間介於兩次監看之間，只能記錄延遲，無法取得當下 stack
+                    self.stalls.append({
+                        "at": datetime.now(tz=timezone.utc).isoformat(),
+                        "lag": round(lag, 3),
+                        "loop_stack": None,
+                        "threads": {},
+                    })
+            if stall is not None:
+                logger.warning("[Watchdog] event loop stalled for %.3fs", lag)
+            elif lag > self.threshold:
+                logger.warning("[Watchdog] event loop lag %.3fs (no stack captured)", lag)
+
+    def _monitor(self):
+        while not self._stop.wait(self.interval / 2):
+            with self._lock:
+                if self._current_stall is not None:
+                    continue
+                beat = self._last_beat
+            blocked = st.monotonic() - beat - self.interval
+            if blocked > self.threshold:
+                try:
+                    stall = self._capture(blocked)
+                except Exception:
+                    logger.exception("[Watchdog] failed to capture stacks")
+                    continue
+                with self._lock:
+                    # 擷取期間 loop 已恢復就丟掉，避免把下一次正常的 heartbeat 當成這次卡住的結束
+                    if self._last_beat == beat:
+                        self._current_stall = stall
+                        self.stalls.append(stall)
+
+    def _capture(self, blocked: float) -> Dict[str, Any]:
+        frames = sys._current_frames()
+        names = {t.ident: t.name for t in threading.enumerate()}
+
+        threads = {}
+        loop_stack = None
+        for ident, frame in frames.items():
+            if ident == threading.get_ident():
+                continue
+            stack = traceback.format_stack(frame, limit=self.stack_limit)
+            if ident == self._loop_thread_id:
+                loop_stack = stack
+            else:
+                threads[names.get(ident, str(ident))] = stack
+
+        return {
+            "at": datetime.now(tz=timezone.utc).isoformat(),
+            "lag": round(blocked, 3),
+            "loop_stack": loop_stack,
+            "threads": threads,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stalled = self._current_stall is not None
+            stalls = list(self.stalls)
+        return {
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "last_lag": round(self.last_lag, 3),
+            "max_lag": round(self.max_lag, 3),
+            "samples": self.samples,
+            "stalled": stalled,
+            "stalls": stalls,
+        }
@@ -0,0 +1,131 @@
+"""
+估算 discord.py 快取中每個伺服器佔用的記憶體，用來決定 instance 大小。
+
+從每個 Guild 物件往下走訪（成員、頻道、身分組、表情、討論串與快取中的訊息），
+以 sys.getsizeof 加總；共用的物件（例如同時在多個伺服器的使用者）只算在第一個走到的伺服器，
+client / connection state 等全域物件不列入，所以各伺服器加總會略小於整個程序的 RSS。
+
+快取只能在 event loop 上讀取（discord.py 會同時修改），所以不丟到 thread 執行，
+改為每走訪 WALK_STEP 個物件就讓出 event loop 一次，大型伺服器也不會卡住心跳與排程。
+"""
+import asyncio
+from collections import deque
+import os
+import sys
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Dict, Iterable, Iterator, List, Set
+
+import discord
+
+WALK_STEP = 5000  # 每走訪幾個物件讓出 event loop 一次
+
+_SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, asyncio.AbstractEventLoop)
+
+
+def _slots(cls) -> Iterable[str]:
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get('__slots__', ())
+        yield from ((slots,) if isinstance(slots, str) else slots)
+
+
+def _walk(obj, seen: Set[int]) -> Iterator[int]:
+    """依序回傳 obj 與其引用到、尚未出現在 seen 中的每個物件的大小（bytes）"""
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIP_TYPES):
+            continue
+        seen.add(id(o))
+        yield sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        elif not isinstance(o, (str, bytes, int, float)):
+            if hasattr(o, '__dict__'):
+                stack.append(vars(o))
+            for name in _slots(type(o)):
+                value = getattr(o, name, None)
+                if value is not None:
+                    stack.append(value)
+
+
+def deep_sizeof(obj, seen: Set[int]) -> int:
+    """obj 與其引用到、尚未出現在 seen 中的物件的大小總和（bytes）"""
+    return sum(_walk(obj, seen))
+
+
+async def deep_sizeof_async(obj, seen: Set[int]) -> int:
+    """與 deep_sizeof 相同，但每走訪 WALK_STEP 個物件讓出 event loop 一次"""
+    total = 0
+    for count, size in enumerate(_walk(obj, seen), 1):
+        total += size
+        if count % WALK_STEP == 0:
+            await asyncio.sleep(0)
+    return total
+
+
+def process_rss() -> int:
+    """目前程序的 RSS（bytes）；無法取得時回傳 0"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        # 非 Linux 平台只能取得峰值
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+async def guild_memory(client: discord.Client) -> List[Dict[str, Any]]:
+    """依估計大小由大到小列出每個伺服器"""
+    guilds = list(client.guilds)
+    # 全域物件與其他伺服器不算進單一伺服器的大小
+    seen = {id(client), id(client._connection), id(client.http)}
+    seen.update(id(guild) for guild in guilds)
+
+    messages: Dict[int, list] = {}
+    for message in list(client.cached_messages):
+        if message.guild is not None:
+            messages.setdefault(message.guild.id, []).append(message)
+
+    report = []
+    for guild in guilds:
+        size = sys.getsizeof(guild)
+        for name in _slots(type(guild)):
+            value = getattr(guild, name, None)
+            if value is not None:
+                size += await deep_sizeof_async(value, seen)
+        guild_messages = messages.get(guild.id, [])
+        message_bytes = await deep_sizeof_async(guild_messages, seen) if guild_messages else 0
+        report.append({
+            'guild': str(guild.id),
+            'name': guild.name,
+            'members': len(guild.members),
+            'channels': len(guild.channels),
+            'messages': len(guild_messages),
+            'bytes': size + message_bytes,
+            'message_bytes': message_bytes,
+        })
+    report.sort(key=lambda g: g['bytes'], reverse=True)
+    return report
+
+
+async def memory_report(client: discord.Client, **settings) -> Dict[str, Any]:
+    guilds = await guild_memory(client)
+    return {
+        'pid': os.getpid(),
+        'rss': process_rss(),
+        'guild_count': len(guilds),
+        'guild_bytes': sum(g['bytes'] for g in guilds),
+        'cached_messages': len(client.cached_messages),
+        **settings,
+        'guilds': guilds,
+    }
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
 import math
 import re
-from typing import Tuple
+from typing import Dict, List, Tuple
 import logging
 
 logger = logging.getLogger("dc_bot")
@@ -18,6 +18,9 @@ SECOND = 1
 # 轉換常數：地球秒 * EORZEA_TIME_CONSTANT = Eorzea 秒
 EORZEA_TIME_CONSTANT: float = 3600.0 / 175.0  # = 20.571428...
 
+# 一個 Eorzea 小時等於 175 地球秒
+EORZEA_HOUR_EARTH_SECONDS = 175
+
 @dataclass
 class EorzeaTime:
     """Eorzea 時間資料結構（全部為整數）"""
@@ -57,29 +60,89 @@ def convert_to_eorzea_time(t: datetime) -> EorzeaTime:
     return EorzeaTime(year=year, month=month, day=day, hour=hour, minute=minute, second=second)
 
 
-def get_ore(et: EorzeaTime, ores) -> str:
-    messages = []
+def eorzea_hour_start(t: datetime) -> datetime:
+    """回傳 t 所在 Eorzea 小時開始的地球時間（與 t 相同時區）"""
+    earth_seconds = t.timestamp()
+    start = math.floor(earth_seconds / EORZEA_HOUR_EARTH_SECONDS) * EORZEA_HOUR_EARTH_SECONDS
+    return datetime.fromtimestamp(start, tz=t.tzinfo or timezone.utc)
+
+
+def get_ore_hours(time) -> List[int]:
+    """解析採集時間設定（'6' 或 '6,18'），格式錯誤時丟出 ValueError"""
+    hours = [int(t) for t in str(time).split(',')]
+    for hour in hours:
+        if not 0 <= hour < 24:
+            raise ValueError(f"invalid eorzea hour: {hour}")
+    return hours
+
 
+def get_ore_list(et: EorzeaTime, ores) -> List[Tuple[str, str]]:
+    """回傳在 et 這個小時出現的 (採集名稱, 地點)"""
+    result = []
     for ore, ore_info in ores.items():
-        if ',' in str(ore_info['time']):
-            for t in ore_info['time'].split(','):
-                if int(t) == et.hour:
-                    messages.append(f'{ore} ( {ore_info["place"]} )')
-        elif int(ore_info['time']) == et.hour:
-            messages.append(f'{ore} ( {ore_info["place"]} )')
+        for t in get_ore_hours(ore_info['time']):
+            if t == et.hour:
+                result.append((ore, ore_info['place']))
+    return result
+
+
+def get_ore(et: EorzeaTime, ores) -> str:
+    return render_ore(et, get_ore_list(et, ores))
+
+
+def render_ore(et: EorzeaTime, ore_list: List[Tuple[str, str]], lead_minutes: int = 5) -> str:
+    messages = [f'{ore} ( {place} )' for ore, place in ore_list]
     
     if len(messages) > 0:
-        messages.insert(0, '5分鐘後限時採集:')
+        messages.insert(0, f'{lead_minutes}分鐘後限時採集:')
         messages.insert(1, f'採集時間--{et.hour:02d}:00')
         return '\n'.join(messages)
     else:
         return ''
 
 
-TEST_ORE = {
-    'TEST': {
-        'time': 6,
-        'place': 'test'
+class OreIndex:
+    """
+    Eorzea 小時 -> {guild_id: [(採集名稱, 地點)]} 的預先計算索引。
+    每個 ET 小時只需查表，沒有到點採集的伺服器不會被處理。
+    """
+
+    def __init__(self):
+        self.guilds: Dict[str, Dict[str, dict]] = {}
+        self._hours: List[Dict[str, List[Tuple[str, str]]]] = [{} for _ in range(24)]
+
+    def set_guild(self, guild_id: str, ores: Dict[str, dict]):
+        """
+        以 ores 取代該伺服器原本的監控清單。
+        先算好新的每小時清單再一次換上，時間格式錯誤（ValueError）時保留原本的索引。
+        """
+        hours: Dict[int, List[Tuple[str, str]]] = {}
+        for ore, ore_info in ores.items():
+            for hour in get_ore_hours(ore_info['time']):
+                hours.setdefault(hour, []).append((ore, ore_info['place']))
+
+        self.remove_guild(guild_id)
+        if not ores:
+            return
+        self.guilds[guild_id] = dict(ores)
+        for hour, ore_list in hours.items():
+            self._hours[hour][guild_id] = ore_list
+
+    def remove_guild(self, guild_id: str):
+        if self.guilds.pop(guild_id, None) is None:
+            return
+        for guilds in self._hours:
+            guilds.pop(guild_id, None)
+
+    def due(self, hour: int) -> Dict[str, List[Tuple[str, str]]]:
+        return self._hours[hour]
+
+
+if __name__ == "__main__":
+    TEST_ORE = {
+        'TEST': {
+            'time': 6,
+            'place': 'test'
+        }
     }
-}
-print(get_ore(datetime.now(), TEST_ORE))
+    print(get_ore(convert_to_eorzea_time(datetime.now(tz=timezone.utc)), TEST_ORE))
@@ -0,0 +1,170 @@
+"""
+航班路線圖卡：把 get_voyage 的資料畫成一張圖片。
+
+繪圖很吃 CPU，所以在 process pool 裡預先產生，存成 cards/<航班>-<資料版本>.png，
+總容量超過上限時從最久沒用到的檔案開始刪除。送出公告時只讀取已經畫好的檔案。
+需要 Pillow；中文字型以環境變數 CARD_FONT_PATH 指定，沒有設定時改用英文名稱。
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import io
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:  # Pillow 為選用套件
+    Image = None
+
+logger = logging.getLogger("dc_bot")
+
+CARD_WIDTH = 900
+ROW_HEIGHT = 64
+HEADER_HEIGHT = 70
+SECTION_HEIGHT = 44
+PADDING = 20
+
+BACKGROUND = (30, 33, 40)
+FOREGROUND = (235, 235, 235)
+MUTED = (150, 155, 165)
+KING = (255, 200, 60)
+COLORS = {
+    'Red': (220, 70, 70),
+    'Green': (70, 180, 100),
+}
+TIME_LABEL = {
+    'D': ('白天', 'Day'),
+    'S': ('黃昏', 'Sunset'),
+    'N': ('夜晚', 'Night'),
+}
+ROUTE_LABEL = {
+    'near': ('近海航線', 'Near route'),
+    'far': ('遠洋航線', 'Far route'),
+}
+
+
+def is_available() -> bool:
+    return Image is not None
+
+
+def _font(font_path: Optional[str], size: int):
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default(size)
+
+
+def render_card(voyage: dict, font_path: Optional[str] = None) -> bytes:
+    """在 worker process 中執行：回傳 PNG bytes"""
+    cht = font_path is not None
+    lang = 0 if cht else 1
+    title_font = _font(font_path, 30)
+    font = _font(font_path, 22)
+    small = _font(font_path, 18)
+
+    height = HEADER_HEIGHT + len(voyage['routes']) * (SECTION_HEIGHT + 3 * ROW_HEIGHT) + PADDING
+    image = Image.new("RGB", (CARD_WIDTH, height), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+
+    title = voyage['departure'].strftime("%Y/%m/%d %H:%M")
+    draw.text((PADDING, PADDING), ("航線時間 " if cht else "Departure ") + title, font=title_font, fill=FOREGROUND)
+
+    y = HEADER_HEIGHT
+    for route in voyage['routes']:
+        draw.text((PADDING, y + 10), ROUTE_LABEL[route['type']][lang], font=font, fill=MUTED)
+        y += SECTION_HEIGHT
+        for i, stop in enumerate(route['stops']):
+            orola = stop['orola']
+            draw.rounded_rectangle(
+                (PADDING, y + 4, CARD_WIDTH - PADDING, y + ROW_HEIGHT - 4), radius=8,
+                outline=KING if orola['king'] else MUTED, width=3 if orola['king'] else 1,
+            )
+            draw.text((PADDING + 12, y + 10), f"{i + 1}. {stop['area']}", font=font, fill=FOREGROUND)
+            draw.text((PADDING + 12, y + 36), TIME_LABEL[stop['time']][lang], font=small, fill=MUTED)
+
+            # 普通海域魚餌 + 幻光拉餌顏色
+            draw.ellipse((200, y + 22, 220, y + 42), fill=COLORS.get(stop['color'], MUTED))
+            draw.text((230, y + 20), stop['bait_cht'] if cht else stop['bait'], font=font, fill=FOREGROUND)
+
+            # 幻海魚餌 / 海王
+            orola_bait = orola['bait_cht'] if cht else orola['bait']
+            if orola['mooch']:
+                orola_bait += "（以小釣大）" if cht else " (mooch)"
+            draw.text((450, y + 10), orola_bait, font=font, fill=FOREGROUND)
+            if orola['king']:
+                king_bait = orola['king_bait_cht'] if cht else orola['king_bait']
+                label = ("幻海海王" if cht else "KING") + (f": {king_bait}" if king_bait else "")
+                draw.ellipse((450, y + 40, 464, y + 54), fill=COLORS.get(orola['color'], MUTED))
+                draw.text((472, y + 36), label, font=small, fill=KING)
+            y += ROW_HEIGHT
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+class CardCache:
+    """cards 目錄的檔案快取，總容量超過 max_bytes 時刪掉最久沒用到的圖卡"""
+
+    def __init__(self, directory, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, voyage: int, data_version: int) -> Path:
+        return self.directory / f"{voyage}-{data_version}.png"
+
+    def get(self, voyage: int, data_version: int) -> Optional[Path]:
+        path = self.path(voyage, data_version)
+        if not path.exists():
+            return None
+        os.utime(path)  # 以 mtime 記錄最近使用時間
+        return path
+
+    def put(self, voyage: int, data_version: int, data: bytes) -> Path:
+        path = self.path(voyage, data_version)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def evict(self):
+        files = sorted(self.directory.glob("*.png"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in files)
+        while files and total > self.max_bytes:
+            oldest = files.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
+
+
+class CardRenderer:
+    """在 process pool 中產生圖卡；同一張圖卡同時只會畫一次"""
+
+    def __init__(self, cache: CardCache, font_path: Optional[str] = None, workers: int = 1):
+        self.cache = cache
+        self.font_path = font_path
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        self._pending: Dict[tuple, asyncio.Future] = {}
+
+    async def ensure(self, voyage: dict) -> Path:
+        key = (voyage['voyage'], voyage['data_version'])
+        path = self.cache.get(*key)
+        if path is not None:
+            return path
+        if key not in self._pending:
+            self._pending[key] = asyncio.ensure_future(self._render(voyage, key))
+        return await asyncio.shield(self._pending[key])
+
+    async def _render(self, voyage: dict, key: tuple) -> Path:
+        try:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(self._pool, render_card, voyage, self.font_path)
+            logger.info("Rendered route card for voyage %s (%d bytes)", key[0], len(data))
+            return self.cache.put(*key, data)
+        finally:
+            self._pending.pop(key, None)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
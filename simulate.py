@@ -0,0 +1,378 @@
+"""
+以虛擬時鐘重播排程，檢查公告時間。
+
+AnnounceBot 的海釣 / 採集排程（_fish_tick、_ore_tick）改由 VirtualClock 驅動：
+所有排程都在等待時鐘時，直接把時間推進到最早的等待點，一週的排程幾秒內就能跑完。
+每則公告都記下應送出時間與實際送出時間，再與直接計算出來的預期排程比對，
+有缺漏、重複或延遲超過容許值時以非 0 結束，可以放在 CI 裡執行。
+
+頻道與監控採集都放在記憶體中，不需要 Redis 與 Discord 連線。
+只模擬預設的排程模式（USE_JOB_QUEUE=0）。
+
+--outage 模擬 gateway 斷線：斷線期間的公告應改由恢復連線後的補發摘要送出，
+仍可登船的航班、仍在的採集點都要出現在摘要中；未指定時在第一天 13:40~14:10 斷線一次。
+
+    python simulate.py --days 7 --start 2025-01-01 --ore "測試:0,6,12,18:某處"
+    python simulate.py --days 1 --outage 2025-01-01T13:40,2025-01-01T14:10
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import logging
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import dc_bot
+from dc_bot import AnnounceBot, TIMEZONE, SCHEDULE_LEAD_MINUTES, VOYAGE_BOARDING_MINUTES, ORE_WINDOW_ET_HOURS
+from fish_notice import get_voyage_number, get_voyage_time
+from ore_notice import (
+    EORZEA_HOUR_EARTH_SECONDS, EORZEA_TIME_CONSTANT, YEAR, MONTH, DAY, HOUR,
+    EorzeaTime, convert_to_eorzea_time, eorzea_hour_start, get_ore_hours,
+)
+
+SIM_GUILD = "sim"
+FISH_CHANNEL = "1"
+ORE_CHANNEL = "2"
+WARMUP = timedelta(minutes=10)  # 開頭與結尾這段時間的公告不列入比對
+DEFAULT_OUTAGE = (timedelta(hours=13, minutes=40), timedelta(hours=14, minutes=10))  # 相對於起始時間
+
+
+class VirtualClock:
+    """
+    離散事件時鐘：sleep() 只登記喚醒時間，由 run_until() 依序推進。
+    speed 為加速倍率，None 表示不實際等待。
+    """
+
+    def __init__(self, start: datetime, speed: Optional[float] = None):
+        self.current = start
+        self.speed = speed
+        self._waiters: List[Tuple[datetime, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    async def now(self) -> datetime:
+        return self.current
+
+    async def sleep(self, seconds: float):
+        await self.sleep_until(self.current + timedelta(seconds=max(seconds, 0)))
+
+    async def sleep_until(self, when: datetime):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (max(when, self.current), next(self._seq), future))
+        await future
+
+    async def run_until(self, end: datetime, tasks: List[asyncio.Task]):
+        """等到所有還在執行的 task 都在等待時鐘，再喚醒最早的一個，直到 end"""
+        while True:
+            while len(self._waiters) < sum(1 for task in tasks if not task.done()):
+                await asyncio.sleep(0)
+            when, _, future = self._waiters[0]
+            if when >= end:
+                return
+            heapq.heappop(self._waiters)
+            if self.speed:
+                await asyncio.sleep((when - self.current).total_seconds() / self.speed)
+            self.current = when
+            future.set_result(None)
+
+
+@dataclass
+class Announcement:
+    kind: str
+    key: int            # 海釣為航班編號，採集為該 ET 小時開始的 epoch 秒
+    channel: str
+    intended: datetime  # 補發摘要為恢復連線的時間
+    actual: datetime
+    catch_up: bool = False
+    ambiguous: bool = False  # 預期公告：落在排程週期邊界附近，單獨公告或補發摘要都算正確
+    optional: bool = False   # 預期公告：可能在補發前就已失效，沒送出也不算缺漏
+
+    @property
+    def delay(self) -> float:
+        return (self.actual - self.intended).total_seconds()
+
+
+def catch_up_keys(kind: str, message: str, now: datetime) -> List[int]:
+    """從補發摘要的內容找出涵蓋的航班 / ET 小時（不經過 bot 的計算，直接比對時間文字）"""
+    if kind == 'fish':
+        current = get_voyage_number(now)
+        return [
+            voyage for voyage in range(current - 2, current + 3)
+            if f'航線時間: {get_voyage_time(voyage).strftime("%Y/%m/%d %H:%M")}' in message
+        ]
+    keys = []
+    start = eorzea_hour_start(now - timedelta(seconds=ORE_WINDOW_ET_HOURS * EORZEA_HOUR_EARTH_SECONDS))
+    while start <= now + timedelta(minutes=SCHEDULE_LEAD_MINUTES):
+        if f"（地球時間 {start.astimezone(TIMEZONE).strftime('%H:%M')}）" in message:
+            keys.append(int(start.timestamp()))
+        start += timedelta(seconds=EORZEA_HOUR_EARTH_SECONDS)
+    return keys
+
+
+def eorzea_to_earth(et: EorzeaTime) -> datetime:
+    """EorzeaTime 所在 ET 小時開始的地球時間"""
+    eorzea_seconds = (et.year - 1) * YEAR + (et.month - 1) * MONTH + (et.day - 1) * DAY + et.hour * HOUR
+    # 加上半個地球秒避免浮點誤差落到前一個 ET 小時
+    return eorzea_hour_start(datetime.fromtimestamp(eorzea_seconds / EORZEA_TIME_CONSTANT + 0.5, tz=TIMEZONE))
+
+
+def _interval(task) -> float:
+    """tasks.loop 的執行間隔（秒）"""
+    return (task.hours or 0) * 3600 + (task.minutes or 0) * 60 + (task.seconds or 0)
+
+
+class SimBot(AnnounceBot):
+    """把送出與儲存換成記錄的 AnnounceBot"""
+
+    def __init__(self, clock: VirtualClock, ores: Dict[str, dict]):
+        super().__init__(command_prefix="!", clock=clock)
+        self._noticed = []
+        self._connected = True
+        self.sent: List[Announcement] = []
+        self._event: Optional[Tuple[str, int, datetime]] = None
+        self._reconnected_at: Optional[datetime] = None
+        self._run_time: Optional[datetime] = None
+        self._channels = {SIM_GUILD: {FISH_CHANNEL: 'fish', ORE_CHANNEL: 'ore'}}
+        dc_bot.ore_index.set_guild(SIM_GUILD, ores)
+
+    async def _load_guild_channels(self):
+        return self._channels
+
+    async def _load_channels(self):
+        return [FISH_CHANNEL], [ORE_CHANNEL]
+
+    async def _get_channels(self, guild_id):
+        return self._channels.get(guild_id, {})
+
+    async def _mark_tick(self, now: datetime, *kinds: str):
+        for kind in kinds:
+            self._last_tick[kind] = now.timestamp()
+
+    async def _send_sea_announcement(self, run_time: datetime, fish_channels):
+        self._run_time = run_time
+        await super()._send_sea_announcement(run_time, fish_channels)
+
+    async def _send_voyage(self, voyage: dict, message: str, fish_channels):
+        # 記錄 bot 經由 get_voyage / next_even_hour_full 實際解析出的航班，與預期的航班比對
+        self._event = ('fish', voyage['voyage'], self._run_time)
+        await super()._send_voyage(voyage, message, fish_channels)
+
+    async def _send_ore_announcement(self, fivemin_time: EorzeaTime):
+        start = eorzea_to_earth(fivemin_time)
+        self._event = ('ore', int(start.timestamp()), start - timedelta(minutes=SCHEDULE_LEAD_MINUTES))
+        await super()._send_ore_announcement(fivemin_time)
+
+    async def _send_to_channel(self, channel_id, message: str, kind: str, **kwargs):
+        if kind in ('fish catch-up', 'ore catch-up'):
+            base = kind.split()[0]
+            for key in catch_up_keys(base, message, self.clock.current):
+                self.sent.append(Announcement(base, key, channel_id, self._reconnected_at, self.clock.current, catch_up=True))
+            return None
+        event_kind, key, intended = self._event if kind in ('fish', 'ore') else (kind, 0, self.clock.current)
+        self.sent.append(Announcement(event_kind, key, channel_id, intended, self.clock.current))
+        return None
+
+    async def _send_king_dms(self, voyage: dict, message: str):
+        pass
+
+    async def _send_ore_dms(self, fivemin_time: EorzeaTime, due):
+        pass
+
+    async def _loop(self, task, tick):
+        """與 tasks.loop 相同：間隔以上一次預定時間起算，超過時立即執行下一次"""
+        interval = timedelta(seconds=_interval(task))
+        next_at = self.clock.current
+        while True:
+            next_at += interval
+            try:
+                await tick()
+            except Exception:
+                dc_bot.logger.exception("Exception in simulated %s", tick.__name__)
+            await self.clock.sleep_until(next_at)
+
+
+def expected_schedule(start: datetime, end: datetime, ores: Dict[str, dict],
+                      outages: List[Tuple[datetime, datetime]] = ()) -> List[Announcement]:
+    """直接由航班時間與 ET 小時計算應送出的公告"""
+    lead = timedelta(minutes=SCHEDULE_LEAD_MINUTES)
+    expected = []
+
+    voyage = get_voyage_number(start)
+    while get_voyage_time(voyage) - lead < end:
+        intended = get_voyage_time(voyage) - lead
+        if intended > start:
+            expected.append(Announcement('fish', voyage, FISH_CHANNEL, intended, intended))
+        voyage += 1
+
+    hours = {hour for ore in ores.values() for hour in get_ore_hours(ore['time'])}
+    hour_start = eorzea_hour_start(start)
+    while hour_start - lead < end:
+        if convert_to_eorzea_time(hour_start).hour in hours:
+            intended = hour_start - lead
+            expected.append(Announcement('ore', int(hour_start.timestamp()), ORE_CHANNEL, intended, intended))
+        hour_start += timedelta(seconds=EORZEA_HOUR_EARTH_SECONDS)
+
+    for outage in outages:
+        expected = [e for e in map(lambda e: _during_outage(e, *outage), expected) if e is not None]
+    return expected
+
+
+def _during_outage(e: Announcement, down: datetime, up: datetime) -> Optional[Announcement]:
+    """
+    斷線期間應送出的公告改為 up 時的補發摘要，補發前已失效的不送。
+    補發與採集公告都在採集排程的 tick 上執行，up 之後（採集公告則是前後）一個週期內的情況依 tick 時間而定。
+    """
+    interval = timedelta(seconds=_interval(AnnounceBot.ore_background_task))
+    if e.kind == 'fish':
+        if not down <= e.intended < up:
+            return e
+        expires = get_voyage_time(e.key) + timedelta(minutes=VOYAGE_BOARDING_MINUTES)
+        if expires <= up:
+            return None
+        return replace(e, intended=up, actual=up, catch_up=True, optional=expires < up + interval)
+
+    if not down - interval < e.intended < up + interval:
+        return e
+    ambiguous = not down <= e.intended < up
+    expires = datetime.fromtimestamp(e.key, tz=TIMEZONE) + timedelta(seconds=ORE_WINDOW_ET_HOURS * EORZEA_HOUR_EARTH_SECONDS)
+    if not ambiguous and expires <= up:
+        return None
+    return replace(e, intended=e.intended if ambiguous else up, catch_up=not ambiguous, ambiguous=ambiguous,
+                   optional=expires < up + interval)
+
+
+def diff_schedule(expected: List[Announcement], sent: List[Announcement], start: datetime, end: datetime,
+                  tolerance: Dict[str, float]) -> List[str]:
+    """回傳比對出的問題；只比對應送出時間落在暖機 / 收尾區間以外的公告"""
+    def in_window(a: Announcement) -> bool:
+        return start + WARMUP <= a.intended < end - WARMUP
+
+    problems = []
+    actual: Dict[tuple, List[Announcement]] = {}
+    for a in sent:
+        if in_window(a) or a.kind not in tolerance:
+            actual.setdefault((a.kind, a.key, a.channel), []).append(a)
+
+    for e in filter(in_window, expected):
+        found = actual.pop((e.kind, e.key, e.channel), [])
+        if not found:
+            if not e.optional:
+                problems.append(f"missing  {e.kind} {e.key} {'catch-up ' if e.catch_up else ''}at {e.intended.isoformat()}")
+            continue
+        if len(found) > 1:
+            problems.append(f"repeated {e.kind} {e.key} x{len(found)} at {e.intended.isoformat()}")
+        for a in found:
+            if a.catch_up != e.catch_up and not e.ambiguous:
+                problems.append(f"wrong    {e.kind} {e.key}: {'caught up' if a.catch_up else 'sent on schedule'} "
+                                f"at {a.actual.isoformat()}, expected {'catch-up' if e.catch_up else 'on schedule'}")
+            elif a.catch_up:
+                # 補發在恢復連線後的第一個採集排程 tick
+                if not 0 <= a.delay <= tolerance['ore']:
+                    problems.append(f"late     {e.kind} {e.key} catch-up: {a.delay:.0f}s after reconnecting")
+            elif a.intended != e.intended:
+                problems.append(f"wrong    {e.kind} {e.key}: intended {a.intended.isoformat()}, expected {e.intended.isoformat()}")
+            elif not 0 <= a.delay <= tolerance[e.kind]:
+                problems.append(f"late     {e.kind} {e.key}: {a.delay:.0f}s after {e.intended.isoformat()}")
+
+    for found in actual.values():
+        for a in found:
+            problems.append(f"extra    {a.kind} {a.key} at {a.actual.isoformat()}")
+    return problems
+
+
+async def _outages(bot: SimBot, clock: VirtualClock, outages: List[Tuple[datetime, datetime]]):
+    for down, up in sorted(outages):
+        await clock.sleep_until(down)
+        await bot.on_disconnect()
+        await clock.sleep_until(up)
+        bot._reconnected_at = clock.current
+        await bot.on_resumed()
+
+
+async def simulate(start: datetime, end: datetime, ores: Dict[str, dict], speed: Optional[float] = None,
+                   outages: List[Tuple[datetime, datetime]] = ()) -> List[Announcement]:
+    clock = VirtualClock(start, speed)
+    bot = SimBot(clock, ores)
+    loops = [
+        asyncio.create_task(bot._loop(AnnounceBot.fish_background_task, bot._fish_tick)),
+        asyncio.create_task(bot._loop(AnnounceBot.ore_background_task, bot._ore_tick)),
+        asyncio.create_task(_outages(bot, clock, outages)),
+    ]
+    try:
+        await clock.run_until(end, loops)
+    finally:
+        for task in loops:
+            task.cancel()
+        await asyncio.gather(*loops, return_exceptions=True)
+        dc_bot.ore_index.remove_guild(SIM_GUILD)
+    return bot.sent
+
+
+def parse_ore(value: str) -> Tuple[str, dict]:
+    """名稱:ET 小時(逗號分隔):地點"""
+    name, hours, place = value.split(':', 2)
+    get_ore_hours(hours)
+    return name, {'time': hours, 'place': place}
+
+
+def parse_outage(value: str) -> Tuple[datetime, datetime]:
+    """斷線開始,結束（YYYY-MM-DDTHH:MM, Asia/Taipei）"""
+    down, up = (datetime.fromisoformat(t).replace(tzinfo=TIMEZONE) for t in value.split(','))
+    if up <= down:
+        raise ValueError("outage must end after it starts")
+    return down, up
+
+
+def main():
+    parser = argparse.ArgumentParser(description="以虛擬時鐘模擬公告排程並比對預期時間")
+    parser.add_argument("--days", type=float, default=7, help="模擬天數（預設 7）")
+    parser.add_argument("--start", help="起始時間 YYYY-MM-DD 或 YYYY-MM-DDTHH:MM（預設今天, Asia/Taipei）")
+    parser.add_argument("--speed", type=float, help="加速倍率；不指定時不實際等待")
+    parser.add_argument("--ore", action="append", type=parse_ore, default=[],
+                        help="監控採集 名稱:ET小時:地點，可重複（預設每個 ET 小時都有一筆）")
+    parser.add_argument("--outage", action="append", type=parse_outage, default=[],
+                        help="斷線期間 開始,結束，可重複（預設第一天 13:40~14:10）")
+    parser.add_argument("--no-outage", action="store_true", help="不模擬斷線")
+    parser.add_argument("--verbose", action="store_true", help="顯示排程的 log 與每則公告")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # 只留下排程的錯誤
+        logging.disable(logging.WARNING)
+
+    if args.start:
+        start = datetime.fromisoformat(args.start).replace(tzinfo=TIMEZONE)
+    else:
+        start = datetime.now(tz=TIMEZONE).replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=args.days)
+    ores = dict(args.ore) or {'模擬': {'time': ",".join(str(h) for h in range(24)), 'place': '模擬'}}
+
+    outages = args.outage
+    if not outages and not args.no_outage and start + DEFAULT_OUTAGE[1] + WARMUP < end:
+        outages = [(start + DEFAULT_OUTAGE[0], start + DEFAULT_OUTAGE[1])]
+
+    sent = asyncio.run(simulate(start, end, ores, args.speed, outages))
+    if args.verbose:
+        for a in sent:
+            print(f"{a.kind + (' catch-up' if a.catch_up else ''):14} {a.key:>12} intended={a.intended.isoformat()} "
+                  f"actual={a.actual.isoformat()} delay={a.delay:.0f}s")
+
+    tolerance = {
+        'fish': 0,
+        'ore': _interval(AnnounceBot.ore_background_task),
+    }
+    problems = diff_schedule(expected_schedule(start, end, ores, outages), sent, start, end, tolerance)
+    for problem in problems:
+        print(problem)
+
+    counts = {kind: sum(1 for a in sent if a.kind == kind) for kind in sorted({a.kind for a in sent})}
+    delays = [a.delay for a in sent if a.kind in tolerance and not a.catch_up and start + WARMUP <= a.intended < end - WARMUP]
+    print(f"simulated {start.isoformat()} ~ {end.isoformat()} ({len(outages)} outages): sent {counts}, "
+          f"max delay {max(delays, default=0):.0f}s, {len(problems)} problems")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+預先計算的海釣航班日曆。
+
+把一段期間內每一班船（每 2 小時一班）的近海/遠洋航線與海王資訊寫成固定長度的二進位檔，
+讀取時以 mmap 開啟，可以 O(1) 查詢單一班次，也能快速掃描一段範圍，
+排程頁面、預報與外部工具可以共用同一份資料，不必各自在 Python 迴圈裡呼叫 get_route。
+
+檔案格式（little-endian）:
+  header: magic(4s) version(H) record_size(H) first_voyage(q) count(I) data_version(I) route_ids(16s)
+  record: near_route(B) near_time(B) far_route(B) far_time(B) king_mask(B)
+    - route 為 header 中 route_ids 的索引，time 為 TIME_LIST 的索引
+    - king_mask 的 bit 0~2 為近海三個釣場、bit 3~5 為遠洋三個釣場是否出現幻海海王
+  data_version / route_ids 為產生檔案時 game_data.json 的版本與航線代號，
+  讀取時以檔案內的航線代號解碼；海王的海域 / 時段要用目前的遊戲資料解碼，版本不同時 kings 會丟出 ValueError。
+  dc_bot 設定 VOYAGE_CALENDAR 時以 rebuild_on_change 維護檔案，遊戲資料換版後重新產生
+"""
+import argparse
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import mmap
+import os
+from pathlib import Path
+import struct
+import logging
+from typing import Iterator, List, Tuple
+from zoneinfo import ZoneInfo
+
+import game_data
+from fish_notice import (
+    TIME_LIST, TWO_HOURS,
+    get_voyage_number, get_voyage_time, get_voyage_route, get_route_stops,
+)
+
+MAGIC = b"VCAL"
+VERSION = 3
+HEADER = struct.Struct("<4sHHqII16s")
+RECORD = struct.Struct("<5B")
+
+logger = logging.getLogger("dc_bot")
+
+VOYAGES_PER_DAY = 24 * 60 * 60 // TWO_HOURS
+SCAN_CHUNK = 256  # scan 每次從 mmap 複製出來的筆數
+
+
+@dataclass(frozen=True)
+class VoyageRecord:
+    voyage: int
+    near_route: str
+    far_route: str
+    king_mask: int
+    data_version: int
+
+
+    @property
+    def departure(self) -> datetime:
+        return get_voyage_time(self.voyage)
+
+    @property
+    def kings(self) -> List[Tuple[str, str]]:
+        """此班次會出現幻海海王的 (海域, 時段)；檔案不是以目前的遊戲資料產生時無法解碼"""
+        if self.data_version != game_data.current().version:
+            raise ValueError(
+                f"voyage calendar was built for game data {self.data_version}, "
+                f"current is {game_data.current().version}; reopen the rebuilt file"
+            )
+        stops = get_route_stops(self.near_route) + get_route_stops(self.far_route)
+        return [stop for i, stop in enumerate(stops) if self.king_mask & (1 << i)]
+
+
+def _route_ids(data: game_data.GameData) -> str:
+    route_ids = "".join(data.area_mapping.keys())
+    if len(route_ids.encode()) > HEADER.size - struct.calcsize("<4sHHqII"):
+        raise ValueError(f"too many route ids for the calendar header: {route_ids}")
+    return route_ids
+
+
+def _encode(voyage: int, route_ids: str, data: game_data.GameData) -> bytes:
+    near_route, far_route = get_voyage_route(voyage)
+    king_mask = 0
+    for i, (area, t) in enumerate(get_route_stops(near_route) + get_route_stops(far_route)):
+        if data.stops[(area, t)]['orola']['king']:
+            king_mask |= 1 << i
+    return RECORD.pack(
+        route_ids.index(near_route[0]), TIME_LIST.index(near_route[1]),
+        route_ids.index(far_route[0]), TIME_LIST.index(far_route[1]),
+        king_mask,
+    )
+
+
+def _decode(voyage: int, fields, route_ids: str, data_version: int) -> VoyageRecord:
+    near_route, near_time, far_route, far_time, king_mask = fields
+    return VoyageRecord(
+        voyage=voyage,
+        near_route=route_ids[near_route] + TIME_LIST[near_time],
+        far_route=route_ids[far_route] + TIME_LIST[far_time],
+        king_mask=king_mask,
+        data_version=data_version,
+    )
+
+
+def build_calendar(path, start: datetime, days: int) -> int:
+    """從 start 所屬班次開始，寫入 days 天份的航班，回傳寫入筆數"""
+    first_voyage = get_voyage_number(start)
+    count = days * VOYAGES_PER_DAY
+    data = game_data.current()
+    route_ids = _route_ids(data)
+
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, first_voyage, count, data.version, route_ids.encode()))
+        f.write(b"".join(_encode(first_voyage + i, route_ids, data) for i in range(count)))
+    # 寫完再換檔，正在 mmap 舊檔的讀取端不受影響
+    os.replace(tmp_path, path)
+    return count
+
+
+class VoyageCalendar:
+    """以 mmap 讀取 build_calendar 產生的檔案（零複製）"""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+        (magic, version, record_size,
+         self.first_voyage, self.count, self.data_version, route_ids) = HEADER.unpack_from(self._mm, 0)
+        self.route_ids = route_ids.rstrip(b"\0").decode()
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is not a voyage calendar v{VERSION} file")
+        if len(self._mm) < HEADER.size + self.count * RECORD.size:
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def is_current(self) -> bool:
+        """檔案是否以目前載入的遊戲資料產生；否則應重新開啟 rebuild 後的檔案"""
+        return self.data_version == game_data.current().version
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, voyage: int) -> bool:
+        return self.first_voyage <= voyage < self.first_voyage + self.count
+
+    def record(self, voyage: int) -> VoyageRecord:
+        if voyage not in self:
+            raise KeyError(voyage)
+        offset = HEADER.size + (voyage - self.first_voyage) * RECORD.size
+        return _decode(voyage, RECORD.unpack_from(self._mm, offset), self.route_ids, self.data_version)
+
+    def lookup(self, targetDate: datetime) -> VoyageRecord:
+        return self.record(get_voyage_number(targetDate))
+
+    def scan(self, start: datetime, end: datetime) -> Iterator[VoyageRecord]:
+        """
+        依序回傳出航時間落在 [start, end) 的班次（超出檔案範圍的部分略過）。
+        每次只複製 SCAN_CHUNK 筆出來，不持有 mmap 的 memoryview，
+        generator 沒跑完時 close() / 重新產生檔案也不會失敗。
+        """
+        first = max(get_voyage_number(start - timedelta(microseconds=1)) + 1, self.first_voyage)
+        last = min(get_voyage_number(end - timedelta(microseconds=1)) + 1, self.first_voyage + self.count)
+        for chunk in range(first, last, SCAN_CHUNK):
+            begin = HEADER.size + (chunk - self.first_voyage) * RECORD.size
+            data = self._mm[begin:begin + min(SCAN_CHUNK, last - chunk) * RECORD.size]
+            for i, fields in enumerate(RECORD.iter_unpack(data)):
+                yield _decode(chunk + i, fields, self.route_ids, self.data_version)
+
+
+def _is_current(path) -> bool:
+    try:
+        with VoyageCalendar(path) as calendar:
+            return calendar.is_current
+    except (OSError, ValueError):
+        return False
+
+
+def rebuild_on_change(path, days: int, tz=ZoneInfo("Asia/Taipei")):
+    """
+    檔案不存在或不是以目前的遊戲資料產生時先重新產生一次，之後遊戲資料每次換版都從今天起重新產生
+    （header 的 data_version 要跟著換版，kings 才能解碼）。
+    以 os.replace 換檔，已開啟的 VoyageCalendar 仍讀舊檔，is_current 為 False 時再重新開啟。
+    """
+    def rebuild(version):
+        start = datetime.now(tz=tz).replace(hour=0, minute=0, second=0, microsecond=0)
+        count = build_calendar(path, start, days)
+        logger.info("Rebuilt voyage calendar %s for game data %s (%d voyages)", path, version, count)
+
+    if not _is_current(path):
+        rebuild(game_data.current().version)
+    game_data.add_listener(lambda old, new, diff: rebuild(new.version))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="產生海釣航班日曆檔")
+    parser.add_argument("path", nargs="?", default="voyages.bin")
+    parser.add_argument("--days", type=int, default=5 * 365, help="涵蓋天數（預設 5 年）")
+    parser.add_argument("--start", help="起始日期 YYYY-MM-DD（預設今天, Asia/Taipei）")
+    args = parser.parse_args()
+
+    tz = ZoneInfo("Asia/Taipei")
+    if args.start:
+        start = datetime.strptime(args.start, "%Y-%m-%d").replace(tzinfo=tz)
+    else:
+        start = datetime.now(tz=tz).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    count = build_calendar(args.path, start, args.days)
+    print(f"wrote {count} voyages to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
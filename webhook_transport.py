@@ -0,0 +1,122 @@
+"""
+以 webhook 送出公告：每個公告頻道建立（或沿用）一個 webhook。
+
+bot 帳號送出的訊息共用同一個全域 rate limit；webhook 各自有獨立的 rate limit bucket，
+大量頻道的廣播可以平行送出。webhook 的 id / token 存在 Redis 的 webhook:<頻道 id> hash
+與記憶體中，所有送出共用同一個 aiohttp session（connection pool）。
+webhook 被刪除（404）時會自動重新建立；建立需要頻道的「管理 Webhook」權限。
+"""
+import asyncio
+import logging
+import time as st
+from typing import Awaitable, Callable, Dict, Optional
+
+import aiohttp
+import discord
+
+logger = logging.getLogger("dc_bot")
+
+FORBIDDEN_RETRY_SECONDS = 10 * 60  # 沒有權限建立 webhook 的頻道，隔多久再試
+
+
+class WebhookRegistry:
+    def __init__(self, redis, name: str, pool_size: int = 20):
+        """redis 需提供 hgetall / hset / delete（例如 RedisWrapper）"""
+        self.redis = redis
+        self.name = name
+        self.pool_size = pool_size
+        self._webhooks: Dict[str, discord.Webhook] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._forbidden: Dict[str, float] = {}  # 頻道 id -> 建立失敗的時間
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # 需在 event loop 中建立，所以第一次使用時才建立
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.pool_size))
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    def _partial(self, webhook_id, token) -> discord.Webhook:
+        return discord.Webhook.partial(int(webhook_id), token, session=self.session)
+
+    async def get(self, channel_id: str, fetch_channel: Callable[[], Awaitable]) -> discord.Webhook:
+        """記憶體 -> Redis -> 頻道上既有的 webhook -> 新建"""
+        webhook = self._webhooks.get(channel_id)
+        if webhook is not None:
+            return webhook
+
+        async with self._locks.setdefault(channel_id, asyncio.Lock()):
+            webhook = self._webhooks.get(channel_id)
+            if webhook is not None:
+                return webhook
+
+            cached = await self.redis.hgetall(f'webhook:{channel_id}')
+            if cached:
+                webhook = self._partial(cached['id'], cached['token'])
+            else:
+                if st.monotonic() - self._forbidden.get(channel_id, -FORBIDDEN_RETRY_SECONDS) < FORBIDDEN_RETRY_SECONDS:
+                    raise PermissionError(f"no permission to manage webhooks in channel {channel_id}")
+                try:
+                    webhook = await self._create(channel_id, await fetch_channel())
+                except discord.Forbidden:
+                    self._forbidden[channel_id] = st.monotonic()
+                    raise
+                self._forbidden.pop(channel_id, None)
+            self._webhooks[channel_id] = webhook
+            return webhook
+
+    async def _create(self, channel_id: str, channel) -> discord.Webhook:
+        if channel is None:
+            raise LookupError(f"channel {channel_id} not found")
+        me = channel.guild.me
+        # 沿用自己先前建立的 webhook，避免 Redis 資料遺失後越建越多
+        for existing in await channel.webhooks():
+            if existing.user is not None and me is not None and existing.user.id == me.id \
+                    and existing.name == self.name and existing.token:
+                created = existing
+                break
+        else:
+            created = await channel.create_webhook(name=self.name, reason="announcement delivery")
+            logger.info("[Webhook] created webhook %s for channel %s", created.id, channel_id)
+        await self.redis.hset(f'webhook:{channel_id}', mapping={'id': str(created.id), 'token': created.token})
+        return self._partial(created.id, created.token)
+
+    async def invalidate(self, channel_id: str):
+        self._webhooks.pop(channel_id, None)
+        await self.redis.delete(f'webhook:{channel_id}')
+
+    async def send(self, channel_id, fetch_channel: Callable[[], Awaitable], content: str,
+                   make_file: Optional[Callable[[], discord.File]] = None, **kwargs) -> discord.WebhookMessage:
+        """
+        送出並等待回應；webhook 已被刪除時重新建立一次再送。
+        附檔送出後就會被關閉，所以以 make_file 在每次送出時產生新的附檔。
+        """
+        channel_id = str(channel_id)
+        for attempt in range(2):
+            webhook = await self.get(channel_id, fetch_channel)
+            try:
+                return await webhook.send(content, wait=True, **({'file': make_file()} if make_file else {}), **kwargs)
+            except discord.NotFound:
+                logger.warning("[Webhook] webhook for channel %s is gone; recreating", channel_id)
+                await self.invalidate(channel_id)
+                if attempt:
+                    raise
+
+    async def remove(self, channel_id):
+        """頻道取消公告時刪除 webhook"""
+        channel_id = str(channel_id)
+        cached = self._webhooks.get(channel_id)
+        if cached is None:
+            raw = await self.redis.hgetall(f'webhook:{channel_id}')
+            cached = self._partial(raw['id'], raw['token']) if raw else None
+        await self.invalidate(channel_id)
+        if cached is not None:
+            try:
+                await cached.delete(reason="announcement channel removed")
+            except discord.HTTPException:
+                pass